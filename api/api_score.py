@@ -7,13 +7,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 import os
 from dotenv import load_dotenv
 
 from app.storeleads_client import StoreLeadsClient
 from app.companyenrich_client import CompanyEnrichClient
 from app.lead_scorer import LeadScorer
+from app.domain_utils import canonicalize_domain
+from app.retry import pick_fallback
+from app.single_flight import SingleFlight
 
 load_dotenv()
 
@@ -43,6 +46,82 @@ except Exception as e:
     companyenrich_client = None
     scorer = LeadScorer()
 
+# Provider lookups in flight, keyed by canonical domain
+lookups = SingleFlight()
+
+
+@app.on_event("startup")
+async def open_client_sessions():
+    """Open the pooled provider sessions before the first lookup"""
+    if storeleads_client:
+        storeleads_client.get_session()
+    if companyenrich_client:
+        companyenrich_client.get_session()
+
+
+@app.on_event("shutdown")
+async def close_client_sessions():
+    """Release pooled provider connections"""
+    if storeleads_client:
+        await storeleads_client.close()
+    if companyenrich_client:
+        await companyenrich_client.close()
+
+
+async def lookup_domain(domain: str) -> Optional[Dict]:
+    """
+    Fetch enrichment data for a domain on the async client path.
+
+    Requests share each client's pooled session and never block the event
+    loop, so one worker can serve many lookups at once. Concurrent requests
+    for the same canonical domain wait for one shared lookup.
+    """
+    return await lookups.do(canonicalize_domain(domain), lambda: fetch_domain(domain))
+
+
+async def fetch_domain(domain: str) -> Optional[Dict]:
+    """StoreLeads first, CompanyEnrich for domains it has no data for"""
+    # Try StoreLeads API first
+    domain_data = None
+    if storeleads_client:
+        try:
+            domain_data = await storeleads_client.fetch_domain_data_async(
+                storeleads_client.get_session(), domain
+            )
+        except Exception as e:
+            print(f"StoreLeads API error: {e}")
+
+    # If StoreLeads didn't find data, try CompanyEnrich
+    if not domain_data or not domain_data.get('success'):
+        if companyenrich_client:
+            try:
+                companyenrich_data = await companyenrich_client.fetch_company_data_async(
+                    companyenrich_client.get_session(), domain
+                )
+                # Keep StoreLeads' error if it was only throttled or unreachable
+                domain_data = pick_fallback(domain_data or {}, companyenrich_data)
+            except Exception as e:
+                print(f"CompanyEnrich API error: {e}")
+
+    return domain_data
+
+
+def require_data(domain_data: Optional[Dict]):
+    """Raise 503 if a provider was unavailable, 404 if neither has the domain"""
+    if domain_data and domain_data.get('success'):
+        return
+
+    if domain_data and domain_data.get('transient'):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Enrichment provider unavailable, try again later: {domain_data.get('error', 'Unknown error')}"
+        )
+
+    raise HTTPException(
+        status_code=404,
+        detail=f"Domain not found in any database: {domain_data.get('error', 'Unknown error') if domain_data else 'No data available'}"
+    )
+
 
 class ScoreResponse(BaseModel):
     domain: str
@@ -88,28 +167,10 @@ async def score_domain(
     if not domain:
         raise HTTPException(status_code=400, detail="Domain parameter is required")
 
-    # Try StoreLeads API first
-    domain_data = None
-    if storeleads_client:
-        try:
-            domain_data = storeleads_client.fetch_domain_data(domain)
-        except Exception as e:
-            print(f"StoreLeads API error: {e}")
-
-    # If StoreLeads didn't find data, try CompanyEnrich
-    if not domain_data or not domain_data.get('success'):
-        if companyenrich_client:
-            try:
-                domain_data = companyenrich_client.fetch_company_data(domain)
-            except Exception as e:
-                print(f"CompanyEnrich API error: {e}")
+    domain_data = await lookup_domain(domain)
 
     # If we still don't have data, return error
-    if not domain_data or not domain_data.get('success'):
-        raise HTTPException(
-            status_code=404,
-            detail=f"Domain not found in any database: {domain_data.get('error', 'Unknown error') if domain_data else 'No data available'}"
-        )
+    require_data(domain_data)
 
     # Calculate score
     result = scorer.calculate_score(domain_data)
@@ -141,28 +202,10 @@ async def score_domain_detailed(
     if not domain:
         raise HTTPException(status_code=400, detail="Domain parameter is required")
 
-    # Try StoreLeads API first
-    domain_data = None
-    if storeleads_client:
-        try:
-            domain_data = storeleads_client.fetch_domain_data(domain)
-        except Exception as e:
-            print(f"StoreLeads API error: {e}")
-
-    # If StoreLeads didn't find data, try CompanyEnrich
-    if not domain_data or not domain_data.get('success'):
-        if companyenrich_client:
-            try:
-                domain_data = companyenrich_client.fetch_company_data(domain)
-            except Exception as e:
-                print(f"CompanyEnrich API error: {e}")
+    domain_data = await lookup_domain(domain)
 
     # If we still don't have data, return error
-    if not domain_data or not domain_data.get('success'):
-        raise HTTPException(
-            status_code=404,
-            detail=f"Domain not found in any database: {domain_data.get('error', 'Unknown error') if domain_data else 'No data available'}"
-        )
+    require_data(domain_data)
 
     # Calculate score
     result = scorer.calculate_score(domain_data)
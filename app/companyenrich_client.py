@@ -1,10 +1,14 @@
 import os
-import requests
-import asyncio
 import aiohttp
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from dotenv import load_dotenv
-from urllib.parse import urlparse
+
+from .rate_limiter import get_rate_limiter
+from .concurrency import get_concurrency_limiter
+from .negative_cache import get_negative_cache
+from .retry import RETRYABLE_STATUSES, get_json_with_retry, get_json_with_retry_sync, is_transient_error
+from .http_session import PooledSession
+from .domain_utils import canonicalize_domain
 
 load_dotenv()
 
@@ -19,33 +23,31 @@ class CompanyEnrichClient:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.rate_limit = int(os.getenv('COMPANYENRICH_RATE_LIMIT', 5))
+        # Shared by every CompanyEnrichClient in the process, sync and async alike
+        self.rate_limiter = get_rate_limiter(
+            'companyenrich', self.rate_limit, int(os.getenv('COMPANYENRICH_RATE_BURST', self.rate_limit))
+        )
+        # Requests in flight adapt between 1 and this cap, starting at the rate limit
+        self.concurrency = get_concurrency_limiter(
+            'companyenrich', self.rate_limit, int(os.getenv('COMPANYENRICH_MAX_CONCURRENCY', self.rate_limit * 4))
+        )
+        self.http = PooledSession(limit_per_host=self.concurrency.maximum)
+        # Domains this provider recently returned 404 for, shared process-wide
+        self.not_found = get_negative_cache(
+            'companyenrich', float(os.getenv('COMPANYENRICH_NOT_FOUND_TTL', 7 * 86400))
+        )
 
     def _extract_domain(self, url: str) -> str:
-        # Clean up the URL first
-        url = url.strip()
-
-        # Fix common typos
-        url = url.replace('https:/www.', 'https://www.')
-        url = url.replace('http:/www.', 'http://www.')
-
-        # Add protocol if missing
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-
-        # Parse the URL
-        parsed = urlparse(url)
-        domain = parsed.netloc or parsed.path
-
-        # Remove www. prefix
-        domain = domain.replace('www.', '')
-
-        # Remove any trailing slashes or paths
-        domain = domain.split('/')[0]
-
-        # Remove any port numbers
-        domain = domain.split(':')[0]
-
-        return domain.lower()
+        # Shared with the cache and batch API so every caller uses the same key
+        return canonicalize_domain(url)
+
+    def _not_found(self, domain: str) -> Dict:
+        return {
+            'domain': domain,
+            'success': False,
+            'error': 'Company not found in Company Enrich database'
+        }
 
     def _parse_revenue(self, revenue_str: str) -> float:
         """Convert revenue strings like 'over-1b' to numeric values"""
@@ -95,113 +97,122 @@ class CompanyEnrichClient:
 
     async def fetch_company_data_async(self, session: aiohttp.ClientSession, domain: str) -> Dict:
         domain = self._extract_domain(domain)
+        if self.not_found.contains(domain):
+            return self._not_found(domain)
+
         url = f"{self.base_url}?domain={domain}"
 
         try:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-
-                    # Parse and normalize the data for scoring - include ALL available fields
-                    normalized_data = {
-                        'name': data.get('name', domain),
-                        'domain': domain,
-                        'website': data.get('website', ''),
-                        'industry': data.get('industry', 'Unknown'),
-                        'industries': ', '.join(data.get('industries', [])) if data.get('industries') else '',
-                        'type': data.get('type', ''),
-                        'categories': ', '.join(data.get('categories', [])) if data.get('categories') else '',
-                        'description': data.get('description', ''),
-                        'keywords': ', '.join(data.get('keywords', [])) if data.get('keywords') else '',
-                        'technologies': ', '.join(data.get('technologies', [])) if data.get('technologies') else '',
-                        'founded_year': data.get('founded_year', 0),
-                        'page_rank': data.get('page_rank', 0),
-
-                        # Parse revenue and employees for scoring
-                        'estimated_sales_yearly': self._parse_revenue(data.get('revenue', '')),
-                        'employee_count': self._parse_employees(data.get('employees', '')),
-
-                        # Raw values for display
-                        'revenue_range': data.get('revenue', 'Unknown'),
-                        'employee_range': data.get('employees', 'Unknown'),
-
-                        # Location details
-                        'country_code': data.get('location', {}).get('country', {}).get('code', 'Unknown'),
-                        'country_name': data.get('location', {}).get('country', {}).get('name', ''),
-                        'state': data.get('location', {}).get('state', {}).get('name', ''),
-                        'state_code': data.get('location', {}).get('state', {}).get('code', ''),
-                        'city': data.get('location', {}).get('city', {}).get('name', ''),
-                        'address': data.get('location', {}).get('address', ''),
-                        'postal_code': data.get('location', {}).get('postal_code', ''),
-                        'phone': data.get('location', {}).get('phone', ''),
-
-                        # Financial details
-                        'stock_symbol': data.get('financial', {}).get('stock_symbol', ''),
-                        'stock_exchange': data.get('financial', {}).get('stock_exchange', ''),
-                        'total_funding': data.get('financial', {}).get('total_funding', 0),
-                        'funding_stage': data.get('financial', {}).get('funding_stage', ''),
-                        'funding_date': data.get('financial', {}).get('funding_date', ''),
-
-                        # Funding history
-                        'funding_rounds': len(data.get('financial', {}).get('funding', [])) if data.get('financial', {}).get('funding') else 0,
-                        'last_funding_amount': data.get('financial', {}).get('funding', [{}])[0].get('amount', 0) if data.get('financial', {}).get('funding') else 0,
-                        'last_funding_type': data.get('financial', {}).get('funding', [{}])[0].get('type', '') if data.get('financial', {}).get('funding') else '',
-
-                        # Social presence
-                        'linkedin_url': data.get('socials', {}).get('linkedin_url', ''),
-                        'linkedin_id': data.get('socials', {}).get('linkedin_id', ''),
-                        'twitter_url': data.get('socials', {}).get('twitter_url', ''),
-                        'facebook_url': data.get('socials', {}).get('facebook_url', ''),
-                        'instagram_url': data.get('socials', {}).get('instagram_url', ''),
-                        'youtube_url': data.get('socials', {}).get('youtube_url', ''),
-                        'crunchbase_url': data.get('socials', {}).get('crunchbase_url', ''),
-                        'angellist_url': data.get('socials', {}).get('angellist_url', ''),
-                        'g2_url': data.get('socials', {}).get('g2_url', ''),
-
-                        # Additional metadata
-                        'logo_url': data.get('logo_url', ''),
-                        'seo_description': data.get('seo_description', ''),
-                        'naics_codes': ', '.join(data.get('naics_codes', [])) if data.get('naics_codes') else '',
-                        'subsidiaries': ', '.join(data.get('subsidiaries', [])) if data.get('subsidiaries') else '',
-
-                        # Platform indicator (for scoring logic)
-                        'platform': 'B2B/Enterprise',
-                        'data_source': 'CompanyEnrich'
-                    }
-
-                    return {
-                        'domain': domain,
-                        'success': True,
-                        'data': normalized_data
-                    }
-                elif response.status == 404:
-                    return {
-                        'domain': domain,
-                        'success': False,
-                        'error': 'Company not found in Company Enrich database'
-                    }
-                else:
-                    return {
-                        'domain': domain,
-                        'success': False,
-                        'error': f'API error: {response.status}'
-                    }
+            status, data = await get_json_with_retry(session, url, self.headers, self.rate_limiter, self.concurrency)
+            if status == 200:
+                # Parse and normalize the data for scoring - include ALL available fields
+                normalized_data = {
+                    'name': data.get('name', domain),
+                    'domain': domain,
+                    'website': data.get('website', ''),
+                    'industry': data.get('industry', 'Unknown'),
+                    'industries': ', '.join(data.get('industries', [])) if data.get('industries') else '',
+                    'type': data.get('type', ''),
+                    'categories': ', '.join(data.get('categories', [])) if data.get('categories') else '',
+                    'description': data.get('description', ''),
+                    'keywords': ', '.join(data.get('keywords', [])) if data.get('keywords') else '',
+                    'technologies': ', '.join(data.get('technologies', [])) if data.get('technologies') else '',
+                    'founded_year': data.get('founded_year', 0),
+                    'page_rank': data.get('page_rank', 0),
+
+                    # Parse revenue and employees for scoring
+                    'estimated_sales_yearly': self._parse_revenue(data.get('revenue', '')),
+                    'employee_count': self._parse_employees(data.get('employees', '')),
+
+                    # Raw values for display
+                    'revenue_range': data.get('revenue', 'Unknown'),
+                    'employee_range': data.get('employees', 'Unknown'),
+
+                    # Location details
+                    'country_code': data.get('location', {}).get('country', {}).get('code', 'Unknown'),
+                    'country_name': data.get('location', {}).get('country', {}).get('name', ''),
+                    'state': data.get('location', {}).get('state', {}).get('name', ''),
+                    'state_code': data.get('location', {}).get('state', {}).get('code', ''),
+                    'city': data.get('location', {}).get('city', {}).get('name', ''),
+                    'address': data.get('location', {}).get('address', ''),
+                    'postal_code': data.get('location', {}).get('postal_code', ''),
+                    'phone': data.get('location', {}).get('phone', ''),
+
+                    # Financial details
+                    'stock_symbol': data.get('financial', {}).get('stock_symbol', ''),
+                    'stock_exchange': data.get('financial', {}).get('stock_exchange', ''),
+                    'total_funding': data.get('financial', {}).get('total_funding', 0),
+                    'funding_stage': data.get('financial', {}).get('funding_stage', ''),
+                    'funding_date': data.get('financial', {}).get('funding_date', ''),
+
+                    # Funding history
+                    'funding_rounds': len(data.get('financial', {}).get('funding', [])) if data.get('financial', {}).get('funding') else 0,
+                    'last_funding_amount': data.get('financial', {}).get('funding', [{}])[0].get('amount', 0) if data.get('financial', {}).get('funding') else 0,
+                    'last_funding_type': data.get('financial', {}).get('funding', [{}])[0].get('type', '') if data.get('financial', {}).get('funding') else '',
+
+                    # Social presence
+                    'linkedin_url': data.get('socials', {}).get('linkedin_url', ''),
+                    'linkedin_id': data.get('socials', {}).get('linkedin_id', ''),
+                    'twitter_url': data.get('socials', {}).get('twitter_url', ''),
+                    'facebook_url': data.get('socials', {}).get('facebook_url', ''),
+                    'instagram_url': data.get('socials', {}).get('instagram_url', ''),
+                    'youtube_url': data.get('socials', {}).get('youtube_url', ''),
+                    'crunchbase_url': data.get('socials', {}).get('crunchbase_url', ''),
+                    'angellist_url': data.get('socials', {}).get('angellist_url', ''),
+                    'g2_url': data.get('socials', {}).get('g2_url', ''),
+
+                    # Additional metadata
+                    'logo_url': data.get('logo_url', ''),
+                    'seo_description': data.get('seo_description', ''),
+                    'naics_codes': ', '.join(data.get('naics_codes', [])) if data.get('naics_codes') else '',
+                    'subsidiaries': ', '.join(data.get('subsidiaries', [])) if data.get('subsidiaries') else '',
+
+                    # Platform indicator (for scoring logic)
+                    'platform': 'B2B/Enterprise',
+                    'data_source': 'CompanyEnrich'
+                }
+
+                return {
+                    'domain': domain,
+                    'success': True,
+                    'data': normalized_data
+                }
+            elif status == 404:
+                self.not_found.add(domain)
+                return self._not_found(domain)
+            else:
+                return {
+                    'domain': domain,
+                    'success': False,
+                    'error': f'API error: {status}',
+                    # Still throttled or failing after retries; not a real absence of data
+                    'transient': status in RETRYABLE_STATUSES
+                }
         except Exception as e:
             return {
                 'domain': domain,
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'transient': is_transient_error(e)
             }
 
+    def get_session(self) -> aiohttp.ClientSession:
+        """Shared keep-alive session for async requests"""
+        return self.http.get()
+
+    async def close(self):
+        await self.http.close()
+
     def fetch_company_data(self, domain: str) -> Dict:
         domain = self._extract_domain(domain)
+        if self.not_found.contains(domain):
+            return self._not_found(domain)
+
         url = f"{self.base_url}?domain={domain}"
 
         try:
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                data = response.json()
-
+            status, data = get_json_with_retry_sync(url, self.headers, self.rate_limiter)
+            if status == 200:
                 # Parse and normalize the data for scoring - include ALL available fields
                 normalized_data = {
                     'name': data.get('name', domain),
@@ -274,21 +285,21 @@ class CompanyEnrichClient:
                     'success': True,
                     'data': normalized_data
                 }
-            elif response.status_code == 404:
-                return {
-                    'domain': domain,
-                    'success': False,
-                    'error': 'Company not found in Company Enrich database'
-                }
+            elif status == 404:
+                self.not_found.add(domain)
+                return self._not_found(domain)
             else:
                 return {
                     'domain': domain,
                     'success': False,
-                    'error': f'API error: {response.status_code}'
+                    'error': f'API error: {status}',
+                    # Still throttled or failing after retries; not a real absence of data
+                    'transient': status in RETRYABLE_STATUSES
                 }
         except Exception as e:
             return {
                 'domain': domain,
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'transient': is_transient_error(e)
             }
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Adaptive (AIMD) limit on in-flight requests to the enrichment APIs
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+# Requests in flight never drop below this
+CONCURRENCY_MIN = int(os.getenv('CONCURRENCY_MIN', 1))
+
+# p95 latency (seconds) above which the limit stops growing
+CONCURRENCY_LATENCY_TARGET = float(os.getenv('CONCURRENCY_LATENCY_TARGET', 2.0))
+
+# Share of failed requests in the recent window above which the limit stops growing
+CONCURRENCY_ERROR_THRESHOLD = float(os.getenv('CONCURRENCY_ERROR_THRESHOLD', 0.05))
+
+# Recent requests the latency and error checks look at
+CONCURRENCY_WINDOW = int(os.getenv('CONCURRENCY_WINDOW', 100))
+
+# The limit is multiplied by this on a 429 or timeout
+CONCURRENCY_BACKOFF = 0.5
+
+# Outcomes passed to release()
+OK = 'ok'
+ERROR = 'error'
+OVERLOAD = 'overload'
+# Abandoned by the caller; frees the slot without counting towards the stats
+CANCELLED = 'cancelled'
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase, multiplicative-decrease cap on concurrent requests.
+
+    While the provider keeps up (p95 latency under target, few errors) and
+    the current limit is actually in use, the limit grows by about one per
+    round trip. A 429 or timeout halves it, at most once per round trip:
+    only requests started after the last cut can cut it again. The token
+    bucket still bounds the request rate; this bounds how many are open.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = CONCURRENCY_MIN,
+                 latency_target: float = CONCURRENCY_LATENCY_TARGET,
+                 error_threshold: float = CONCURRENCY_ERROR_THRESHOLD,
+                 window: int = CONCURRENCY_WINDOW):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+
+        self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.failures: Deque[bool] = deque(maxlen=window)
+        self.last_decrease = 0.0
+        self.decreases = 0
+
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to release()"""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # Pass the wake-up on to the next waiter
+                    self._wake()
+                raise
+
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, outcome: str = OK):
+        """Free a slot and adjust the limit from how the request went"""
+        latency = time.monotonic() - started
+
+        with self._lock:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+
+            if outcome != CANCELLED:
+                self.failures.append(outcome != OK)
+
+            if outcome == OVERLOAD:
+                if started >= self.last_decrease:
+                    self.limit = max(self.minimum, self.limit * CONCURRENCY_BACKOFF)
+                    self.last_decrease = time.monotonic()
+                    self.decreases += 1
+            elif outcome == OK:
+                self.latencies.append(latency)
+                if saturated and self._healthy():
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        self._wake()
+
+    def _healthy(self) -> bool:
+        if sum(self.failures) > self.error_threshold * len(self.failures):
+            return False
+        return self.p95() <= self.latency_target
+
+    def p95(self) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "maximum": self.maximum,
+            "p95_latency": round(self.p95(), 3),
+            "decreases": self.decreases
+        }
+
+
+_limiters: Dict[str, AdaptiveConcurrency] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(name: str, initial: int, maximum: int) -> AdaptiveConcurrency:
+    """Return the process-wide concurrency limiter for provider `name`"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveConcurrency(initial, maximum)
+        return _limiters[name]
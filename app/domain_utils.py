@@ -0,0 +1,187 @@
+"""
+Canonical domain names shared by the API clients, the cache and the batch API
+"""
+import ipaddress
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Sequence, Set
+from urllib.parse import urlsplit
+
+# Public Suffix List bundled with the app, so no network access is needed
+PUBLIC_SUFFIX_LIST_PATH = os.getenv(
+    'PUBLIC_SUFFIX_LIST_PATH',
+    str(Path(__file__).with_name('public_suffix_list.dat'))
+)
+
+# Reduce hosts to their registrable domain (shop.brand.com -> brand.com)
+REGISTRABLE_DOMAINS_ONLY = os.getenv('REGISTRABLE_DOMAINS_ONLY', 'true').lower() == 'true'
+
+# Distinct inputs remembered by canonicalize_domain
+DOMAIN_CACHE_SIZE = int(os.getenv('DOMAIN_CACHE_SIZE', 100000))
+
+# Header names looked for, in order, to find the column holding domains in a CSV
+DOMAIN_COLUMNS = ['website', 'domain', 'url']
+
+# "https:/www.x.com" and similar typos with a single slash after the scheme
+_SCHEME_TYPO = re.compile(r'^(https?):/(?!/)', re.IGNORECASE)
+
+# Bare hosts (the common case in lead lists) skip URL parsing
+_URL_PARTS = re.compile(r'[/:@?#\[\\]')
+
+
+class PublicSuffixList:
+    """
+    Rules from a publicsuffix.org list, loaded on first use.
+
+    Both the ICANN and private sections are used, so hosted stores such as
+    brand.myshopify.com keep their own name rather than collapsing into
+    myshopify.com.
+    """
+
+    def __init__(self, path: str = PUBLIC_SUFFIX_LIST_PATH):
+        self.path = path
+        self.rules: Set[str] = set()
+        self.wildcards: Set[str] = set()
+        self.exceptions: Set[str] = set()
+        # Every trailing part of every rule, to stop matching early
+        self.tails: Set[str] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    rule = line.strip()
+                    if not rule or rule.startswith('//'):
+                        continue
+
+                    # Rules are listed in Unicode; hosts may arrive in either form
+                    for form in {rule, self._to_ascii(rule)}:
+                        if form.startswith('!'):
+                            form = form[1:]
+                            self.exceptions.add(form)
+                        elif form.startswith('*.'):
+                            form = form[2:]
+                            self.wildcards.add(form)
+                        else:
+                            self.rules.add(form)
+
+                        labels = form.split('.')
+                        for i in range(len(labels)):
+                            self.tails.add('.'.join(labels[i:]))
+
+            self._loaded = True
+
+    def _to_ascii(self, rule: str) -> str:
+        try:
+            return '.'.join(
+                label if label in ('*', '') or label.startswith('!') or label.isascii()
+                else label.encode('idna').decode('ascii')
+                for label in rule.split('.')
+            )
+        except UnicodeError:
+            return rule
+
+    def suffix_length(self, labels: List[str]) -> int:
+        """Number of trailing labels that form the public suffix"""
+        if not self._loaded:
+            self._load()
+
+        # Unlisted TLDs are public suffixes of one label
+        length = 1
+        parent = ''
+
+        # Grow the candidate from the TLD leftwards; the longest matching rule wins
+        for i in range(len(labels) - 1, -1, -1):
+            candidate = labels[i] + '.' + parent if parent else labels[i]
+            if candidate in self.exceptions:
+                return len(labels) - i - 1
+            if candidate in self.rules or parent in self.wildcards:
+                length = len(labels) - i
+            if candidate not in self.tails:
+                break
+            parent = candidate
+
+        return length
+
+    def registrable_domain(self, host: str) -> str:
+        """The suffix plus one label, or the host itself if it is a public suffix"""
+        labels = host.split('.')
+        suffix_length = self.suffix_length(labels)
+        if suffix_length >= len(labels):
+            return host
+        return '.'.join(labels[-(suffix_length + 1):])
+
+
+public_suffixes = PublicSuffixList()
+
+
+def _host(value: str) -> str:
+    value = value.strip()
+    if not _URL_PARTS.search(value):
+        return value.lower().rstrip('.')
+
+    url = _SCHEME_TYPO.sub(r'\1://', value)
+
+    # Add protocol if missing
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        host = urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+    return host.rstrip('.')
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def canonicalize_domain(value: str) -> str:
+    """
+    Reduce a URL or host to the domain used for API calls and cache keys.
+
+    Scheme, credentials, port, path and case are dropped, along with a
+    leading "www." label (only a whole label, so awww.com is left alone).
+    Unless REGISTRABLE_DOMAINS_ONLY is off, subdomains are folded into the
+    registrable domain from the Public Suffix List, so shop.brand.com and
+    brand.com share one lookup. Returns "" when no host can be found.
+    """
+    host = _host(value)
+    if not host:
+        return ''
+
+    if host.startswith('www.') and host.count('.') > 1:
+        host = host[4:]
+
+    # IP addresses have no registrable domain; no TLD ends in a digit
+    if host[-1].isdigit() or ':' in host:
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+    if REGISTRABLE_DOMAINS_ONLY and '.' in host:
+        return public_suffixes.registrable_domain(host)
+    return host
+
+
+def domain_column_index(header: Sequence[str]) -> int:
+    """Position of the domain column in a CSV header: website, domain or url, else the first"""
+    names = [str(name).strip() for name in header]
+    for column in DOMAIN_COLUMNS:
+        if column in names:
+            return names.index(column)
+    return 0
+
+
+def canonicalize_domains(values: Iterable[str]) -> List[str]:
+    """Canonicalize many values in order; entries with no host become ""."""
+    return [canonicalize_domain(value) for value in values]
+
@@ -0,0 +1,88 @@
+"""
+Memory of domains a provider has recently reported as not found
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+# Not-found domains remembered per provider
+NEGATIVE_CACHE_SIZE = int(os.getenv('NEGATIVE_CACHE_SIZE', 100000))
+
+
+class NegativeCache:
+    """
+    Domains that returned 404 from one provider, each kept for `ttl` seconds.
+
+    Checked before a request is made (and before a rate-limit token is
+    taken), so lists that keep coming back with the same dead domains stop
+    spending quota on them. Oldest entries are dropped beyond `maxsize`;
+    a `ttl` of 0 disables the cache.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = NEGATIVE_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Domain -> expiry time, oldest first
+        self.entries: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def contains(self, domain: str) -> bool:
+        """Whether `domain` is known to be missing at this provider"""
+        if self.ttl <= 0:
+            return False
+
+        with self._lock:
+            expires_at = self.entries.get(domain)
+            if expires_at is None:
+                self.misses += 1
+                return False
+            if expires_at < time.time():
+                del self.entries[domain]
+                self.misses += 1
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, domain: str):
+        """Remember a not-found response for `domain`"""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self.entries[domain] = time.time() + self.ttl
+            self.entries.move_to_end(domain)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self.entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+_caches: Dict[str, NegativeCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_negative_cache(name: str, ttl: float) -> NegativeCache:
+    """
+    Return the process-wide negative cache for provider `name`.
+
+    Every client of a provider shares it, so a 404 seen by the CSV pipeline
+    also saves the lookup for the API and the other way round.
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = NegativeCache(ttl)
+        return _caches[name]
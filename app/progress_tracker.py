@@ -1,15 +1,47 @@
-from typing import Dict, Optional, Callable
+from typing import Dict, Optional, Callable, AsyncIterator, List
 import asyncio
+import copy
+import os
+import time
 from datetime import datetime
 
+from .progress_store import create_progress_store
+
+# Minimum seconds between pushed progress frames for one subscriber
+PROGRESS_PUSH_INTERVAL = float(os.getenv('PROGRESS_PUSH_INTERVAL', 0.5))
+
+# Sessions not updated for this many seconds are evicted
+PROGRESS_SESSION_TTL = float(os.getenv('PROGRESS_SESSION_TTL', 3600))
+
+# Most sessions kept at once; the least recently updated are evicted first
+PROGRESS_MAX_SESSIONS = int(os.getenv('PROGRESS_MAX_SESSIONS', 500))
+
+# Most recent errors kept per session
+PROGRESS_MAX_ERRORS = int(os.getenv('PROGRESS_MAX_ERRORS', 50))
+
+# Minimum seconds between evictions triggered by new sessions
+PROGRESS_SWEEP_INTERVAL = float(os.getenv('PROGRESS_SWEEP_INTERVAL', 60))
+
 class ProgressTracker:
-    def __init__(self):
-        self.progress_data: Dict[str, Dict] = {}
+    def __init__(self, store=None):
+        # Session state lives in the store so other workers can read it
+        self.store = store or create_progress_store()
         self.websocket_connections: Dict[str, list] = {}
+        # Change notifications for push subscribers, one event per subscriber
+        self.subscribers: Dict[str, List[asyncio.Event]] = {}
+        self.last_sweep = 0.0
+        # Updates not yet written, and when each session was last written
+        self.pending: Dict[str, List[Callable[[Dict], None]]] = {}
+        self.last_write: Dict[str, float] = {}
+        self.flush_handles: Dict[str, asyncio.TimerHandle] = {}
 
     def create_session(self, session_id: str, total_items: int):
         """Create a new progress tracking session"""
-        self.progress_data[session_id] = {
+        # Processes without a background sweeper still stay bounded
+        if time.monotonic() - self.last_sweep >= PROGRESS_SWEEP_INTERVAL:
+            self.evict_expired()
+
+        self.store.create(session_id, {
             'total': total_items,
             'current': 0,
             'stage': 'initializing',
@@ -22,16 +54,24 @@ class ProgressTracker:
                 'companyenrich': {'current': 0, 'total': 0},
                 'scoring': {'current': 0, 'total': total_items}
             }
-        }
+        })
+        self._notify(session_id)
 
     def update_progress(self, session_id: str, current: int = None, stage: str = None,
-                       message: str = None, error: str = None, api_progress: Dict = None):
+                       message: str = None, error: str = None, api_progress: Dict = None,
+                       total: int = None):
         """Update progress for a session"""
-        if session_id not in self.progress_data:
-            return
+        def apply(session: Dict):
+            # Streamed inputs only learn their size as they are read
+            if total is not None:
+                session['total'] = total
+            self._apply_update(session, current, stage, message, error, api_progress)
 
-        session = self.progress_data[session_id]
+        # Called once per domain; merged so a shared store isn't locked per domain
+        self._write(session_id, apply, defer=True)
 
+    def _apply_update(self, session: Dict, current: Optional[int], stage: Optional[str],
+                      message: Optional[str], error: Optional[str], api_progress: Optional[Dict]):
         if current is not None:
             session['current'] = current
 
@@ -46,6 +86,11 @@ class ProgressTracker:
                 'time': datetime.now().isoformat(),
                 'error': error
             })
+            # Keep only the latest errors; a failing batch can raise one per domain
+            if len(session['errors']) > PROGRESS_MAX_ERRORS:
+                dropped = len(session['errors']) - PROGRESS_MAX_ERRORS
+                del session['errors'][:dropped]
+                session['errors_dropped'] = session.get('errors_dropped', 0) + dropped
 
         if api_progress:
             session['api_progress'] = api_progress
@@ -92,32 +137,177 @@ class ProgressTracker:
 
     def complete_session(self, session_id: str, success: bool = True, message: str = None):
         """Mark a session as complete"""
-        if session_id not in self.progress_data:
+        def apply(session: Dict):
+            session['completed'] = True
+            session['success'] = success
+            session['current'] = session['total']
+            session['percentage'] = 100 if success else session.get('percentage', 0)
+
+            if message:
+                session['message'] = message
+            elif success:
+                session['message'] = 'Processing completed successfully!'
+            else:
+                session['message'] = 'Processing failed. Check errors for details.'
+
+        self._write(session_id, apply)
+        self.last_write.pop(session_id, None)
+
+    def set_result(self, session_id: str, **fields):
+        """Attach result fields (e.g. result_file, summary) to a session"""
+        self._write(session_id, lambda session: session.update(fields))
+
+    def _write(self, session_id: str, mutate: Callable[[Dict], None], defer: bool = False):
+        """
+        Apply `mutate` to the stored session, after any updates still pending.
+
+        Deferred updates arriving within `store.write_interval` of the last
+        write are held and written together when the interval is up. Without
+        a running event loop to schedule that on, they are written at once.
+        """
+        self.pending.setdefault(session_id, []).append(mutate)
+
+        interval = self.store.write_interval
+        if defer and interval:
+            wait = self.last_write.get(session_id, 0.0) + interval - time.monotonic()
+            if wait > 0:
+                if session_id in self.flush_handles:
+                    return
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    loop = None
+                if loop is not None:
+                    self.flush_handles[session_id] = loop.call_later(wait, self._flush, session_id)
+                    return
+
+        self._flush(session_id)
+
+    def _flush(self, session_id: str):
+        """Write a session's pending updates in one store update"""
+        handle = self.flush_handles.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+
+        updates = self.pending.pop(session_id, [])
+        if not updates:
             return
+        self.last_write[session_id] = time.monotonic()
 
-        session = self.progress_data[session_id]
-        session['completed'] = True
-        session['success'] = success
-        session['current'] = session['total']
-        session['percentage'] = 100 if success else session.get('percentage', 0)
+        def apply(session: Dict):
+            for mutate in updates:
+                mutate(session)
 
-        if message:
-            session['message'] = message
-        elif success:
-            session['message'] = 'Processing completed successfully!'
-        else:
-            session['message'] = 'Processing failed. Check errors for details.'
+        if self.store.update(session_id, apply) is not None:
+            self._notify(session_id)
+
+    def subscribe(self, session_id: str) -> asyncio.Event:
+        """Register for change notifications on a session"""
+        event = asyncio.Event()
+        self.subscribers.setdefault(session_id, []).append(event)
+        return event
+
+    def unsubscribe(self, session_id: str, event: asyncio.Event):
+        """Stop change notifications for a subscriber"""
+        events = self.subscribers.get(session_id, [])
+        if event in events:
+            events.remove(event)
+        if not events:
+            self.subscribers.pop(session_id, None)
+
+    def _notify(self, session_id: str):
+        for event in self.subscribers.get(session_id, []):
+            event.set()
+
+    async def stream_updates(self, session_id: str,
+                             min_interval: float = PROGRESS_PUSH_INTERVAL) -> AsyncIterator[Dict]:
+        """
+        Yield progress frames for a session as it changes.
+
+        The first frame is the full progress dict; later frames only carry the
+        top-level keys that changed since the previous frame. Updates arriving
+        within `min_interval` of each other are coalesced into one frame, so
+        the frame rate follows the UI refresh rate rather than the domain
+        count. The final frame is always sent once the session completes.
+
+        Changes made in this process wake the stream at once; with a shared
+        store, changes from other workers are picked up by polling the
+        session version every `store.poll_interval` seconds.
+        """
+        event = self.subscribe(session_id)
+        last_sent: Dict = {}
+        last_version = None
+
+        try:
+            while True:
+                event.clear()
+                version = self.store.version(session_id)
+                if version is None:
+                    return
+
+                if version == last_version:
+                    await self._wait_for_change(event)
+                    continue
+                last_version = version
+
+                # Snapshot before yielding: the memory store hands out the live
+                # session, which can complete while the consumer is sending
+                progress = copy.deepcopy(self.get_progress(session_id))
+                if progress is None:
+                    return
+
+                frame = {key: value for key, value in progress.items() if last_sent.get(key) != value}
+                if frame:
+                    last_sent = progress
+                    yield frame
+
+                if progress.get('completed'):
+                    return
+
+                await self._wait_for_change(event)
+                await asyncio.sleep(min_interval)
+        finally:
+            self.unsubscribe(session_id, event)
+
+    async def _wait_for_change(self, event: asyncio.Event):
+        """Wait for a local notification, or until the store should be polled"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=self.store.poll_interval)
+        except asyncio.TimeoutError:
+            pass
 
     def get_progress(self, session_id: str) -> Optional[Dict]:
         """Get current progress for a session"""
-        return self.progress_data.get(session_id)
+        return self.store.get(session_id)
+
+    def _forget_writes(self, session_id: str):
+        handle = self.flush_handles.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+        self.pending.pop(session_id, None)
+        self.last_write.pop(session_id, None)
 
     def cleanup_session(self, session_id: str):
         """Remove session data after completion"""
-        if session_id in self.progress_data:
-            del self.progress_data[session_id]
+        self._forget_writes(session_id)
+        self.store.delete(session_id)
         if session_id in self.websocket_connections:
             del self.websocket_connections[session_id]
+        self._notify(session_id)
+
+    def evict_expired(self, max_age: float = PROGRESS_SESSION_TTL,
+                      max_sessions: int = PROGRESS_MAX_SESSIONS) -> int:
+        """Evict idle sessions and any beyond the size cap; returns how many were removed"""
+        self.last_sweep = time.monotonic()
+        removed = self.store.evict(max_age, max_sessions)
+
+        for session_id in removed:
+            self._forget_writes(session_id)
+            self.websocket_connections.pop(session_id, None)
+            # Open streams see the session is gone and finish
+            self._notify(session_id)
+
+        return len(removed)
 
 # Global progress tracker instance
 progress_tracker = ProgressTracker()
\ No newline at end of file
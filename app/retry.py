@@ -0,0 +1,262 @@
+"""
+Retries for throttled and transient enrichment API failures
+
+Both clients send their GETs through here. 429 and 5xx responses and
+connection errors are retried with jittered exponential backoff, honouring
+Retry-After. A 429 also pauses the provider's shared rate limiter, so every
+caller slows down instead of piling more requests onto a throttled API.
+Retries are drawn from a budget that grows with the number of requests,
+scoped to a batch when one is active, so an outage cannot multiply load.
+"""
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+import requests
+
+from .rate_limiter import TokenBucket
+from .concurrency import AdaptiveConcurrency, OK, ERROR, OVERLOAD, CANCELLED
+
+# Statuses worth another attempt; anything else is returned as is
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Attempts per request, including the first
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 4))
+
+# Backoff before retry n is random between 0 and base * 2^n seconds, capped at the max
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.5))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 30))
+
+# Retries allowed per request made, plus a starting allowance per batch
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', 0.2))
+RETRY_BUDGET_MIN = int(os.getenv('RETRY_BUDGET_MIN', 10))
+
+
+class RetryBudget:
+    """
+    Retries earned by requests: each request adds `ratio` of a retry and each
+    retry spends one. Starts with `minimum` so small batches can still retry.
+    `cap` bounds the balance of long-lived budgets.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, minimum: int = RETRY_BUDGET_MIN,
+                 cap: Optional[float] = None):
+        self.ratio = ratio
+        self.balance = float(minimum)
+        self.cap = cap
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.balance += self.ratio
+            if self.cap is not None:
+                self.balance = min(self.balance, self.cap)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                self.denied += 1
+                return False
+            self.balance -= 1
+            self.retries += 1
+            return True
+
+
+# Used outside of a batch (single-domain lookups); kept small so it refills quickly
+_process_budget = RetryBudget(cap=RETRY_BUDGET_MIN)
+_current_budget: contextvars.ContextVar = contextvars.ContextVar('retry_budget', default=None)
+
+
+def current_retry_budget() -> RetryBudget:
+    return _current_budget.get() or _process_budget
+
+
+def use_retry_budget(budget: Optional[RetryBudget] = None) -> contextvars.Token:
+    """
+    Give the current context (and tasks created from it) its own budget.
+
+    Returns a token for reset_retry_budget once the batch is done.
+    """
+    return _current_budget.set(budget or RetryBudget())
+
+
+def reset_retry_budget(token: contextvars.Token):
+    _current_budget.reset(token)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Connection failures and timeouts, as opposed to bad responses"""
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError,
+                              requests.ConnectionError, requests.Timeout))
+
+
+def pick_fallback(storeleads_result: Dict, companyenrich_result: Dict) -> Dict:
+    """
+    The Company Enrich answer for a domain Store Leads could not score,
+    unless Company Enrich failed while Store Leads was only throttled or
+    unreachable: then the transient failure is kept, so callers can tell
+    an outage (not cached, worth retrying) from a domain neither knows.
+    """
+    if storeleads_result.get("transient") and not companyenrich_result.get("success"):
+        return storeleads_result
+    return companyenrich_result
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header given as a delay or an HTTP date"""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _retry_delay(attempt: int, status: Optional[int], retry_after: Optional[float],
+                 rate_limiter: TokenBucket, budget: RetryBudget) -> Optional[float]:
+    """
+    Seconds this caller should sleep before retrying, or None to give up.
+
+    Throttling is applied to the shared rate limiter instead of the caller,
+    so the next token for anyone is pushed back by the same delay. A
+    Retry-After longer than RETRY_MAX_DELAY is not waited out here: the
+    request gives up rather than retrying before the provider allows it.
+    """
+    if status is not None and status not in RETRYABLE_STATUSES:
+        return None
+    if retry_after is not None and retry_after > RETRY_MAX_DELAY:
+        if status == 429:
+            rate_limiter.penalize(retry_after)
+        return None
+    if attempt + 1 >= RETRY_MAX_ATTEMPTS or not budget.try_spend():
+        return None
+
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    if retry_after is not None:
+        delay = retry_after + delay * 0.1
+
+    if status == 429:
+        rate_limiter.penalize(delay)
+        return 0.0
+    return delay
+
+
+def _outcome(status: Optional[int], error: Optional[BaseException] = None) -> str:
+    """How a request went, for the adaptive concurrency limit"""
+    if isinstance(error, asyncio.CancelledError):
+        return CANCELLED
+    if status == 429 or isinstance(error, asyncio.TimeoutError):
+        return OVERLOAD
+    if error is not None or (status is not None and status >= 500):
+        return ERROR
+    return OK
+
+
+async def _get_once(session: aiohttp.ClientSession, url: str, headers: dict, rate_limiter: TokenBucket,
+                    concurrency: Optional[AdaptiveConcurrency]) -> Tuple[int, Any, Optional[float]]:
+    """
+    One GET inside a concurrency slot: (status, JSON body or None, Retry-After)
+
+    The rate-limit token is taken once the slot is held, so callers queued
+    for a slot don't sit on tokens and then all fire past the burst size.
+    """
+    started = await concurrency.acquire() if concurrency else 0.0
+    status = None
+    error = None
+    try:
+        await rate_limiter.acquire_async()
+        # Latency for the concurrency limit starts when the request goes out
+        started = time.monotonic() if concurrency else started
+        async with session.get(url, headers=headers) as response:
+            status = response.status
+            if status == 200:
+                return status, await response.json(), None
+            return status, None, parse_retry_after(response.headers.get('Retry-After'))
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if concurrency:
+            concurrency.release(started, _outcome(status, error))
+
+
+async def get_json_with_retry(session: aiohttp.ClientSession, url: str, headers: dict,
+                              rate_limiter: TokenBucket,
+                              concurrency: Optional[AdaptiveConcurrency] = None) -> Tuple[int, Any]:
+    """
+    GET `url`, retrying transient failures. Returns (status, JSON body or None).
+
+    With `concurrency`, each attempt holds one of its slots and reports how
+    it went. The last connection error is raised once retries run out.
+    """
+    budget = current_retry_budget()
+    budget.record_request()
+    attempt = 0
+
+    while True:
+        try:
+            status, data, retry_after = await _get_once(session, url, headers, rate_limiter, concurrency)
+            if status == 200:
+                return status, data
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+            delay = _retry_delay(attempt, None, None, rate_limiter, budget)
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay(attempt, status, retry_after, rate_limiter, budget)
+            if delay is None:
+                return status, None
+
+        attempt += 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def get_json_with_retry_sync(url: str, headers: dict, rate_limiter: TokenBucket) -> Tuple[int, Any]:
+    """Blocking version of get_json_with_retry for the requests-based clients"""
+    budget = current_retry_budget()
+    budget.record_request()
+    attempt = 0
+
+    while True:
+        rate_limiter.acquire()
+        try:
+            response = requests.get(url, headers=headers)
+            if response.status_code == 200:
+                return 200, response.json()
+            status = response.status_code
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+            delay = _retry_delay(attempt, None, None, rate_limiter, budget)
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay(attempt, status, retry_after, rate_limiter, budget)
+            if delay is None:
+                return status, None
+
+        attempt += 1
+        if delay > 0:
+            time.sleep(delay)
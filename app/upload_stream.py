@@ -0,0 +1,219 @@
+"""
+Incremental parsing of multipart CSV uploads
+"""
+import asyncio
+import codecs
+import csv
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import Request
+from starlette.requests import ClientDisconnect
+from multipart.multipart import MultipartParser, parse_options_header
+
+from .domain_utils import domain_column_index
+
+# Optional cap on domains read from one upload (0 = no limit)
+MAX_DOMAINS = int(os.getenv('MAX_DOMAINS', 0))
+
+# Parsed domains held ahead of the pipeline; reading the upload pauses while this many wait
+UPLOAD_QUEUE_SIZE = int(os.getenv('UPLOAD_QUEUE_SIZE', 1000))
+
+
+class CSVDomainParser:
+    """
+    Turn CSV bytes, fed in arbitrary pieces, into domains.
+
+    Only complete lines are parsed, so a row split across network reads is
+    held back until the rest of it arrives. The first line is the header and
+    picks the domain column with domain_column_index, as CSVProcessor does.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+        self._pending = ''
+        self._column: Optional[int] = None
+
+    def feed(self, data: bytes) -> List[str]:
+        lines = (self._pending + self._decoder.decode(data)).split('\n')
+        # The last piece has no newline yet
+        self._pending = lines.pop()
+        return self._parse(lines)
+
+    def close(self) -> List[str]:
+        line = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        return self._parse([line])
+
+    def _parse(self, lines: List[str]) -> List[str]:
+        domains = []
+
+        for row in csv.reader(line.rstrip('\r') for line in lines):
+            if not row:
+                continue
+
+            if self._column is None:
+                self._column = domain_column_index(row)
+                continue
+
+            if len(row) > self._column:
+                website = row[self._column].strip()
+                if website:
+                    domains.append(website)
+
+        return domains
+
+
+class MultipartCSVUpload:
+    """
+    Read the CSV file part of a multipart/form-data request as it arrives.
+
+    Domains are yielded as soon as the lines holding them have been
+    received; the upload is never written to disk or held in memory whole.
+    `filename` is set once the file part's headers have been read, which
+    is always before its first domain is yielded. Reading stops after
+    `max_domains` domains when that is set. A malformed or interrupted
+    upload raises ValueError, like any other bad upload.
+    """
+
+    def __init__(self, request: Request, field_name: str = 'file', max_domains: int = MAX_DOMAINS):
+        self.request = request
+        self.field_name = field_name
+        self.max_domains = max_domains
+        self.filename: Optional[str] = None
+
+    async def domains(self) -> AsyncIterator[str]:
+        reader = self._read_domains()
+        count = 0
+        try:
+            async for domain in reader:
+                if self.max_domains and count >= self.max_domains:
+                    print(f"Warning: Limiting upload to first {self.max_domains} domains (MAX_DOMAINS).")
+                    return
+                count += 1
+                yield domain
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV: {e}") from e
+        except ClientDisconnect as e:
+            raise ValueError("Upload ended before the file was complete") from e
+        finally:
+            await reader.aclose()
+
+    async def _read_domains(self) -> AsyncIterator[str]:
+        content_type, params = parse_options_header(self.request.headers.get('content-type', ''))
+        if content_type != b'multipart/form-data' or b'boundary' not in params:
+            raise ValueError("Expected a multipart/form-data upload")
+
+        csv_parser = CSVDomainParser()
+        ready: List[str] = []
+        headers: Dict[bytes, bytes] = {}
+        header_field = bytearray()
+        header_value = bytearray()
+        state = {'in_file': False, 'found': False}
+
+        def on_part_begin():
+            headers.clear()
+
+        def on_header_field(data: bytes, start: int, end: int):
+            header_field.extend(data[start:end])
+
+        def on_header_value(data: bytes, start: int, end: int):
+            header_value.extend(data[start:end])
+
+        def on_header_end():
+            headers[bytes(header_field).lower()] = bytes(header_value)
+            header_field.clear()
+            header_value.clear()
+
+        def on_headers_finished():
+            _, options = parse_options_header(headers.get(b'content-disposition', b''))
+            name = options.get(b'name', b'').decode('utf-8', 'replace')
+            # Only the first file part with the expected field name is read
+            if name == self.field_name and not state['found']:
+                state['in_file'] = True
+                self.filename = options.get(b'filename', b'').decode('utf-8', 'replace')
+
+        def on_part_data(data: bytes, start: int, end: int):
+            if state['in_file']:
+                ready.extend(csv_parser.feed(data[start:end]))
+
+        def on_part_end():
+            if state['in_file']:
+                ready.extend(csv_parser.close())
+                state['in_file'] = False
+                state['found'] = True
+
+        parser = MultipartParser(params[b'boundary'], {
+            'on_part_begin': on_part_begin,
+            'on_header_field': on_header_field,
+            'on_header_value': on_header_value,
+            'on_header_end': on_header_end,
+            'on_headers_finished': on_headers_finished,
+            'on_part_data': on_part_data,
+            'on_part_end': on_part_end
+        })
+
+        async for chunk in self.request.stream():
+            parser.write(chunk)
+            for domain in ready:
+                yield domain
+            ready.clear()
+
+        parser.finalize()
+        for domain in ready:
+            yield domain
+
+        if not state['found']:
+            raise ValueError(f"No '{self.field_name}' file in upload")
+
+
+class DomainFeed:
+    """
+    Hand-off of parsed domains from the upload reader to the pipeline.
+
+    At most `maxsize` domains wait here. Once that many are queued, putting
+    another waits for the pipeline, and so does reading the upload, so the
+    client's send is slowed to the provider rate instead of the file piling
+    up in memory.
+    """
+
+    def __init__(self, maxsize: int = UPLOAD_QUEUE_SIZE):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def put(self, domain: str):
+        await self._queue.put(domain)
+
+    async def close(self):
+        await self._queue.put(None)
+
+    async def fill(self, domains: AsyncIterator[str], consumer: asyncio.Task):
+        """
+        Put every domain from `domains`, then close the feed.
+
+        The domains are read by a task of their own while this waits on it
+        and on `consumer`: if the consumer ends first (it failed), nothing
+        will take from a full queue any more, so reading is stopped instead
+        of waiting forever. Errors from reading are raised here.
+        """
+        reader = asyncio.ensure_future(self._fill(domains))
+        try:
+            await asyncio.wait({reader, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not reader.done():
+                reader.cancel()
+                await asyncio.gather(reader, return_exceptions=True)
+
+        if not reader.cancelled():
+            reader.result()
+
+    async def _fill(self, domains: AsyncIterator[str]):
+        async for domain in domains:
+            await self.put(domain)
+        await self.close()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            domain = await self._queue.get()
+            if domain is None:
+                return
+            yield domain
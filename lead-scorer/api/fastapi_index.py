@@ -11,17 +11,17 @@ from pathlib import Path
 # Add parent directory to path to import app modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
-import tempfile
 import uuid
 import asyncio
 from typing import Optional
 
 from app.csv_processor import CSVProcessor
 from app.progress_tracker import progress_tracker
+from app.upload_stream import MultipartCSVUpload, DomainFeed
 
 app = FastAPI()
 
@@ -34,9 +34,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store results temporarily (in production, use a database or Redis)
-results_store = {}
-
 @app.get("/", response_class=HTMLResponse)
 async def index():
     """Serve the main HTML page"""
@@ -534,32 +531,47 @@ async def index():
     return HTMLResponse(content=html_content)
 
 @app.post("/api/process")
-async def process_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def process_file(request: Request, background_tasks: BackgroundTasks):
     """Process uploaded CSV file"""
     session_id = str(uuid.uuid4())
 
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-        content = await file.read()
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
+    # Create progress tracking; the total grows as the upload is read
+    progress_tracker.create_session(session_id, 0)
+
+    # Domains are parsed from the upload as it arrives and scored right away
+    websites = DomainFeed()
+    task = asyncio.create_task(process_csv_background(session_id, websites))
+
+    domains = MultipartCSVUpload(request).domains()
+    try:
+        # Reading the upload keeps pace with scoring; it waits while the feed is full
+        await websites.fill(domains, task)
+    except ValueError as e:
+        # Malformed, truncated or disconnected uploads all surface as ValueError
+        task.cancel()
+        progress_tracker.complete_session(session_id, success=False, message=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        task.cancel()
+        progress_tracker.complete_session(session_id, success=False, message=str(e))
+        raise
+    finally:
+        await domains.aclose()
 
-    # Start background processing
-    background_tasks.add_task(process_csv_background, session_id, tmp_path)
+    # Keep the invocation alive until processing ends
+    background_tasks.add_task(wait_for_processing, task)
 
     return JSONResponse({"session_id": session_id, "message": "Processing started"})
 
-async def process_csv_background(session_id: str, file_path: str):
+async def wait_for_processing(task: asyncio.Task):
+    """Serverless runtimes freeze once the handler returns, so hold it open"""
+    await task
+
+async def process_csv_background(session_id: str, websites: DomainFeed):
     """Background task to process CSV"""
     processor = CSVProcessor()
 
     try:
-        # Read domains from CSV
-        websites = processor.read_input_csv(file_path)
-
-        # Create progress tracking
-        progress_tracker.create_session(session_id, len(websites))
-
         # Process websites with progress callback
         def progress_callback(api_progress, stage=None, message=None, error=None):
             progress_tracker.update_progress(
@@ -567,7 +579,8 @@ async def process_csv_background(session_id: str, file_path: str):
                 stage=stage,
                 message=message,
                 error=error,
-                api_progress=api_progress
+                api_progress=api_progress,
+                total=api_progress['storeleads']['total']
             )
 
         # Process the websites
@@ -576,8 +589,8 @@ async def process_csv_background(session_id: str, file_path: str):
         # Save results
         output_path = processor.save_results(df)
 
-        # Store results for download
-        results_store[session_id] = output_path
+        # Store results for download (kept with the session so any worker can serve it)
+        progress_tracker.set_result(session_id, result_file=output_path)
 
         # Mark as complete
         progress_tracker.complete_session(session_id, success=True)
@@ -586,11 +599,8 @@ async def process_csv_background(session_id: str, file_path: str):
         progress_tracker.complete_session(session_id, success=False, message=str(e))
 
     finally:
-        # Clean up temp file
-        try:
-            os.unlink(file_path)
-        except:
-            pass
+        await processor.storeleads_client.close()
+        await processor.companyenrich_client.close()
 
 @app.get("/api/progress/{session_id}")
 async def get_progress(session_id: str):
@@ -605,10 +615,11 @@ async def get_progress(session_id: str):
 @app.get("/api/download/{session_id}")
 async def download_results(session_id: str):
     """Download processed results"""
-    if session_id not in results_store:
+    progress = progress_tracker.get_progress(session_id)
+    if not progress or not progress.get('result_file'):
         raise HTTPException(status_code=404, detail="Results not found")
 
-    file_path = results_store[session_id]
+    file_path = progress['result_file']
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
@@ -1,22 +1,29 @@
 """
 API routes for HubSpot integration and domain scoring
 """
-from fastapi import APIRouter, HTTPException, Header, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Header, BackgroundTasks, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict
 import asyncio
 import aiohttp
 import uuid
+import json
+import time
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
-from .database import Database
+from .database import Database, RESULTS_PAGE_SIZE
 from .lead_scorer import LeadScorer
 from .storeleads_client import StoreLeadsClient
 from .companyenrich_client import CompanyEnrichClient
-from .scoring_utils import should_use_companyenrich
+from .scoring_utils import should_use_companyenrich, has_sufficient_data_for_scoring
+from .domain_utils import canonicalize_domain, canonicalize_domains
+from .retry import use_retry_budget, reset_retry_budget, pick_fallback
+from .single_flight import SingleFlight
+from .rate_limiter import TokenBucket
+from .score_refresher import ScoreRefresher, freshness, REFRESH_RATE_SHARE
 
 load_dotenv()
 
@@ -28,9 +35,29 @@ lead_scorer = LeadScorer()
 storeleads_client = StoreLeadsClient()
 companyenrich_client = CompanyEnrichClient()
 
+# Provider lookups in flight, keyed by canonical domain
+score_lookups = SingleFlight()
+
 # API Key configuration
 API_KEY = os.getenv("LEADSCORER_API_KEY", "default-api-key-change-this")
 
+# Concurrent lookups per batch job; throughput is capped by the provider rate limits
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 10))
+
+# Minimum seconds between batch progress/cache writes; results are buffered in between
+BATCH_FLUSH_INTERVAL = float(os.getenv("BATCH_FLUSH_INTERVAL", 2))
+
+# Query both providers at once for /api/score/{domain} (can be set per request with ?hedge=)
+HEDGED_LOOKUPS = os.getenv("HEDGED_LOOKUPS", "false").lower() == "true"
+
+# Hedged lookups allowed per minute (0 turns hedging off). Store Leads is asked
+# either way, so only the extra Company Enrich call is counted against this
+HEDGE_COMPANYENRICH_PER_MINUTE = float(os.getenv("HEDGE_COMPANYENRICH_PER_MINUTE", 60))
+
+# Once the allowance runs out, lookups fall back to the sequential path
+hedge_guard = (TokenBucket(HEDGE_COMPANYENRICH_PER_MINUTE / 60, max(1, int(HEDGE_COMPANYENRICH_PER_MINUTE)))
+               if HEDGE_COMPANYENRICH_PER_MINUTE > 0 else None)
+
 class BatchRequest(BaseModel):
     domains: List[str] = Field(..., min_items=1, max_items=4000)
     webhook_url: Optional[str] = None
@@ -38,19 +65,8 @@ class BatchRequest(BaseModel):
 
     @validator('domains')
     def validate_domains(cls, v):
-        # Clean and validate domains
-        cleaned = []
-        for domain in v:
-            # Remove protocol and www
-            domain = domain.strip().lower()
-            domain = domain.replace("https://", "").replace("http://", "")
-            domain = domain.replace("www.", "")
-            # Remove paths
-            if "/" in domain:
-                domain = domain.split("/")[0]
-            if domain:
-                cleaned.append(domain)
-        return cleaned
+        # Same canonical form as the API clients and the cache keys
+        return [domain for domain in canonicalize_domains(v) if domain]
 
 class ScoreResponse(BaseModel):
     domain: str
@@ -60,6 +76,7 @@ class ScoreResponse(BaseModel):
     attributes: Optional[Dict] = {}
     last_updated: str
     cached: bool = False
+    stale: bool = False
 
 class BatchStatusResponse(BaseModel):
     job_id: str
@@ -73,31 +90,129 @@ class BatchStatusResponse(BaseModel):
     completed_at: Optional[str] = None
     results_summary: Optional[Dict] = None
 
+@router.on_event("startup")
+async def open_client_sessions():
+    """Open the pooled provider sessions before the first lookup"""
+    storeleads_client.get_session()
+    companyenrich_client.get_session()
+
+@router.on_event("shutdown")
+async def close_client_sessions():
+    """Release pooled provider connections"""
+    await storeleads_client.close()
+    await companyenrich_client.close()
+
+@router.on_event("startup")
+async def start_refresher():
+    """Start re-enriching stale cached scores in the background"""
+    global refresher_task
+    if refresher.enabled:
+        refresher_task = asyncio.create_task(refresher.run())
+
+@router.on_event("shutdown")
+async def stop_refresher():
+    if refresher_task:
+        refresher_task.cancel()
+
 async def verify_api_key(x_api_key: str = Header(None)):
     """Verify API key for authentication"""
     if not x_api_key or x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
     return True
 
-async def score_domain(domain: str, use_cache: bool = True) -> Dict:
-    """Score a single domain"""
-    # Check cache first
+async def score_domain(domain: str, use_cache: bool = True, save: bool = True,
+                       hedge: bool = False) -> Dict:
+    """
+    Score a single domain.
+
+    With save=False the result is not written to the cache; batch jobs use
+    this to collect results and write them with one bulk insert. hedge=True
+    asks both providers at once when the hedge allowances permit.
+    """
+    domain = canonicalize_domain(domain)
+
+    # Check cache first; stale scores are served while a refresh is queued
     if use_cache:
         cached = db.get_scored_domain(domain)
         if cached:
-            return {**cached, "cached": True}
+            state = freshness(cached)
+            if state == 'fresh':
+                return {**cached, "cached": True}
+            if state == 'stale':
+                refresher.request(domain)
+                return {**cached, "cached": True, "stale": True}
+
+    # Concurrent misses for the same domain share one enrichment and, when
+    # saving, one cache write; callers that don't save get their own flight
+    if save:
+        lookup = lambda: enrich_score_and_save(domain, hedge)
+    else:
+        lookup = lambda: enrich_and_score(domain, hedge)
+    result = await score_lookups.do((domain, save), lookup)
+
+    return {**result}
+
+async def enrich_score_and_save(domain: str, hedge: bool = False) -> Dict:
+    """Score a domain and write it to the cache unless the lookup errored"""
+    result = await enrich_and_score(domain, hedge)
+
+    if "error" not in result["attributes"]:
+        db.save_scored_domain(
+            domain=domain,
+            score=result["score"],
+            grade=result["grade"],
+            priority=result["priority"],
+            attributes=result["attributes"]
+        )
+
+    return result
+
+def try_hedge() -> bool:
+    """Take one hedged lookup from the Company Enrich allowance, if it has one"""
+    return hedge_guard is not None and hedge_guard.try_acquire()
+
+async def fetch_hedged(domain: str) -> Dict:
+    """
+    Ask both providers at once and use the first answer with enough data to
+    score. The other request is cancelled. If neither has enough, the
+    fallback is picked as on the sequential path.
+    """
+    storeleads_task = asyncio.ensure_future(
+        storeleads_client.fetch_domain_data_async(storeleads_client.get_session(), domain)
+    )
+    companyenrich_task = asyncio.ensure_future(
+        companyenrich_client.fetch_company_data_async(companyenrich_client.get_session(), domain)
+    )
+    pending = {storeleads_task, companyenrich_task}
 
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # StoreLeads wins a tie, as it would sequentially
+            for task in (storeleads_task, companyenrich_task):
+                if task in done and has_sufficient_data_for_scoring(task.result()):
+                    return task.result()
+        return pick_fallback(storeleads_task.result(), companyenrich_task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def enrich_and_score(domain: str, hedge: bool = False) -> Dict:
+    """Fetch provider data for a canonical domain and score it, without caching"""
     # Score the domain using existing logic
     try:
-        # Always try StoreLeads first (it's faster)
-        async with aiohttp.ClientSession() as session:
-            result = await storeleads_client.fetch_domain_data_async(session, domain)
-
-        # Only use CompanyEnrich if StoreLeads doesn't have sufficient data
-        if should_use_companyenrich(result):
-            # Fallback to CompanyEnrich for better data
-            async with aiohttp.ClientSession() as session:
-                result = await companyenrich_client.fetch_company_data_async(session, domain)
+        if hedge and try_hedge():
+            result = await fetch_hedged(domain)
+        else:
+            # Always try StoreLeads first (it's faster)
+            result = await storeleads_client.fetch_domain_data_async(storeleads_client.get_session(), domain)
+
+            # Only use CompanyEnrich if StoreLeads doesn't have sufficient data
+            if should_use_companyenrich(result):
+                # Fallback to CompanyEnrich for better data
+                result = pick_fallback(result, await companyenrich_client.fetch_company_data_async(
+                    companyenrich_client.get_session(), domain
+                ))
 
         # Calculate score, grade, and priority
         scoring_result = lead_scorer.calculate_score(result)
@@ -113,14 +228,9 @@ async def score_domain(domain: str, use_cache: bool = True) -> Dict:
             "platform": scoring_result.get("metrics", {}).get("platform", ""),
         }
 
-        # Save to cache
-        db.save_scored_domain(
-            domain=domain,
-            score=int(scoring_result["score"]),
-            grade=scoring_result["grade"],
-            priority=scoring_result["priority"],
-            attributes=attributes
-        )
+        # Throttling or outages that outlast the retries are reported, never cached
+        if result.get("transient"):
+            attributes["error"] = result["error"]
 
         return {
             "domain": domain,
@@ -133,15 +243,7 @@ async def score_domain(domain: str, use_cache: bool = True) -> Dict:
         }
 
     except Exception as e:
-        # Save failed attempt with score 0
-        db.save_scored_domain(
-            domain=domain,
-            score=0,
-            grade="F",
-            priority="Very Low",
-            attributes={"error": str(e)}
-        )
-
+        # Failed attempts score 0 but are not cached, so the next request tries again
         return {
             "domain": domain,
             "score": 0,
@@ -152,10 +254,30 @@ async def score_domain(domain: str, use_cache: bool = True) -> Dict:
             "cached": False
         }
 
+async def refresh_domain(domain: str) -> bool:
+    """
+    Re-score a cached domain for the background refresher.
+
+    A lookup that errored (provider outage, rate limit) keeps the previous
+    score. "No Data" is a real answer and is saved like any other, so a
+    domain that lost its data stops being refreshed.
+    """
+    result = await score_domain(domain, use_cache=False, save=False)
+    if "error" in result["attributes"]:
+        return False
+
+    db.save_scored_domains_bulk([result])
+    return True
+
+# Refreshes get their own share of the Store Leads rate limit
+refresher = ScoreRefresher(db, refresh_domain, REFRESH_RATE_SHARE * storeleads_client.rate_limit)
+refresher_task = None
+
 @router.get("/score/{domain}", response_model=ScoreResponse)
 async def get_domain_score(
     domain: str,
     use_cache: bool = True,
+    hedge: Optional[bool] = None,
     authenticated: bool = Depends(verify_api_key)
 ):
     """
@@ -163,8 +285,9 @@ async def get_domain_score(
 
     - **domain**: The domain to score (e.g., example.com)
     - **use_cache**: Whether to use cached results if available (default: true)
+    - **hedge**: Query both providers at once for lower latency, at the cost of extra quota (default: HEDGED_LOOKUPS)
     """
-    result = await score_domain(domain, use_cache)
+    result = await score_domain(domain, use_cache, hedge=HEDGED_LOOKUPS if hedge is None else hedge)
     return ScoreResponse(**result)
 
 @router.post("/score-batch")
@@ -211,59 +334,104 @@ async def process_batch(job_id: str, domains: List[str], webhook_url: Optional[s
     processed = 0
     successful = 0
     failed = 0
-    results = []
-
-    # Check cache for all domains first if use_cache is True
-    cached_results = {}
-    domains_to_process = []
-
-    if use_cache:
-        cached_results = db.get_batch_domains(domains)
-        domains_to_process = [d for d in domains if d.lower() not in cached_results]
-    else:
-        domains_to_process = domains
-
-    # Add cached results
-    for domain, data in cached_results.items():
-        results.append({**data, "cached": True})
-        processed += 1
-        successful += 1
-
-    # Update progress after cached results
-    db.update_batch_job(
-        job_id=job_id,
-        processed=processed,
-        successful=successful
-    )
-
-    # Process remaining domains
-    for domain in domains_to_process:
-        try:
-            result = await score_domain(domain, use_cache=False)
-            results.append(result)
-            successful += 1
-        except Exception as e:
-            results.append({
-                "domain": domain,
-                "score": 0,
-                "grade": "F",
-                "priority": "Very Low",
-                "error": str(e)
-            })
-            failed += 1
-
-        processed += 1
-
-        # Update progress
+    # One slot per input domain, so results stay in input order
+    results = [None] * len(domains)
+
+    # Uncached domains are scored by a pool of workers as soon as each cache
+    # chunk has been checked; pacing comes from the shared provider rate
+    # limiters instead of a fixed delay per domain
+    queue = asyncio.Queue(maxsize=BATCH_WORKERS * 4)
+
+    # Scored rows waiting to be written to the cache in one transaction
+    pending_rows = []
+    last_flush = time.monotonic()
+
+    def flush_progress():
+        nonlocal pending_rows, last_flush
+        db.save_scored_domains_bulk(pending_rows)
+        pending_rows = []
         db.update_batch_job(
             job_id=job_id,
             processed=processed,
             successful=successful,
             failed=failed
         )
-
-        # Rate limiting - wait a bit between requests
-        await asyncio.sleep(0.5)
+        last_flush = time.monotonic()
+
+    async def produce():
+        nonlocal processed, successful
+        if use_cache:
+            chunks = db.iter_batch_domains(domains)
+        else:
+            chunks = [(domains, {})]
+
+        # Chunks are consecutive slices of `domains`
+        position = 0
+        for chunk, hits in chunks:
+            for domain in chunk:
+                cached = hits.get(domain.lower())
+                state = freshness(cached) if cached else None
+                if state == 'fresh':
+                    results[position] = {**cached, "cached": True}
+                    processed += 1
+                    successful += 1
+                elif state == 'stale':
+                    refresher.request(domain.lower())
+                    results[position] = {**cached, "cached": True, "stale": True}
+                    processed += 1
+                    successful += 1
+                else:
+                    await queue.put((position, domain))
+                position += 1
+
+            # Report cached results without waiting for the whole lookup
+            if time.monotonic() - last_flush >= BATCH_FLUSH_INTERVAL:
+                flush_progress()
+            await asyncio.sleep(0)
+
+        for _ in range(BATCH_WORKERS):
+            await queue.put(None)
+
+    async def worker():
+        nonlocal processed, successful, failed
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            position, domain = item
+
+            try:
+                result = await score_domain(domain, use_cache=False, save=False)
+                results[position] = result
+                # Lookups that errored (e.g. still throttled after retries) are failures, not cached
+                if "error" in result["attributes"]:
+                    failed += 1
+                else:
+                    pending_rows.append(result)
+                    successful += 1
+            except Exception as e:
+                results[position] = {
+                    "domain": domain,
+                    "score": 0,
+                    "grade": "F",
+                    "priority": "Very Low",
+                    "error": str(e)
+                }
+                failed += 1
+
+            processed += 1
+
+            # Update progress, coalesced so big batches don't commit per domain
+            if time.monotonic() - last_flush >= BATCH_FLUSH_INTERVAL:
+                flush_progress()
+
+    # Retries for this job come from its own budget
+    budget_token = use_retry_budget()
+    try:
+        await asyncio.gather(produce(), *(worker() for _ in range(BATCH_WORKERS)))
+    finally:
+        reset_retry_budget(budget_token)
+    flush_progress()
 
     # Create summary
     summary = {
@@ -282,11 +450,12 @@ async def process_batch(job_id: str, domains: List[str], webhook_url: Optional[s
         summary["grade_distribution"][grade] = summary["grade_distribution"].get(grade, 0) + 1
         summary["priority_distribution"][priority] = summary["priority_distribution"].get(priority, 0) + 1
 
-    # Update job as completed
+    # Store per-domain results, then mark the job completed with its summary
+    db.save_batch_results(job_id, results)
     db.update_batch_job(
         job_id=job_id,
         status="completed",
-        results={"summary": summary, "domains": results}
+        summary=summary
     )
 
     # Send webhook if provided
@@ -339,28 +508,114 @@ async def get_batch_status(
         progress_percentage=round(progress_percentage, 2),
         created_at=job["created_at"],
         completed_at=job["completed_at"],
-        results_summary=job["results"]["summary"] if job["results"] else None
+        results_summary=job["summary"]
     )
 
+def get_completed_job(job_id: str) -> Dict:
+    """Fetch a batch job, or raise if it doesn't exist or is still running"""
+    job = db.get_batch_job(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Job not completed yet")
+
+    return job
+
+async def iter_result_pages(job_id: str, after: int = -1):
+    """Yield a job's results one storage page at a time"""
+    while True:
+        page = list(db.iter_batch_results(job_id, after=after, limit=RESULTS_PAGE_SIZE))
+        if not page:
+            return
+        yield page
+        after = page[-1][0]
+        # Let other requests run between pages
+        await asyncio.sleep(0)
+
 @router.get("/batch-results/{job_id}")
 async def get_batch_results(
     job_id: str,
+    cursor: Optional[int] = Query(None, ge=0, description="Position of the last result already received"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to get every result"),
     authenticated: bool = Depends(verify_api_key)
 ):
     """
-    Get the full results of a completed batch job.
+    Get the results of a completed batch job.
 
     - **job_id**: The job ID returned from /api/score-batch
+    - **limit**: Return one page of results plus a `next_cursor`
+    - **cursor**: Pass the previous `next_cursor` to get the following page
+
+    Without `limit` the full result set is streamed as one JSON document.
+    Either way the results are listed under `domains`.
     """
-    job = db.get_batch_job(job_id)
+    job = get_completed_job(job_id)
+    after = -1 if cursor is None else cursor
 
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+    if limit is not None:
+        page = list(db.iter_batch_results(job_id, after=after, limit=limit))
+        return {
+            "summary": job["summary"],
+            "domains": [result for _, result in page],
+            "next_cursor": page[-1][0] if len(page) == limit else None
+        }
 
-    if job["status"] != "completed":
-        raise HTTPException(status_code=400, detail="Job not completed yet")
+    async def stream_document():
+        yield '{"summary": ' + json.dumps(job["summary"]) + ', "domains": ['
+        first = True
+        async for page in iter_result_pages(job_id, after):
+            chunk = ', '.join(json.dumps(result) for _, result in page)
+            yield chunk if first else ', ' + chunk
+            first = False
+        yield ']}'
+
+    return StreamingResponse(stream_document(), media_type="application/json")
 
-    return job["results"]
+@router.get("/batch-results/{job_id}/stream")
+async def stream_batch_results(
+    job_id: str,
+    cursor: Optional[int] = Query(None, ge=0, description="Position of the last result already received"),
+    authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Stream the results of a completed batch job as NDJSON.
+
+    One JSON object per line, in job order, each with its `position` so an
+    interrupted download can resume with `cursor`.
+    """
+    get_completed_job(job_id)
+    after = -1 if cursor is None else cursor
+
+    async def stream_lines():
+        async for page in iter_result_pages(job_id, after):
+            yield ''.join(json.dumps({"position": position, **result}) + '\n' for position, result in page)
+
+    return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
+
+@router.get("/cache-stats")
+async def get_cache_stats(authenticated: bool = Depends(verify_api_key)):
+    """
+    Size and hit/miss counters of the in-memory score cache for this worker,
+    plus counters of the background refresher under `refresh` and of each
+    provider's not-found cache under `not_found` and adaptive concurrency
+    limit under `concurrency`. `coalesced` counts lookups that joined one
+    already in flight for the same domain.
+    """
+    return {
+        **db.cache.stats(),
+        "refresh": refresher.stats(),
+        "not_found": {
+            "storeleads": storeleads_client.not_found.stats(),
+            "companyenrich": companyenrich_client.not_found.stats()
+        },
+        "concurrency": {
+            "storeleads": storeleads_client.concurrency.stats(),
+            "companyenrich": companyenrich_client.concurrency.stats()
+        },
+        "coalesced": score_lookups.stats()
+    }
 
 @router.post("/webhook-test")
 async def test_webhook(
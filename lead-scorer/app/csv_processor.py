@@ -1,6 +1,6 @@
 import pandas as pd
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, AsyncIterable, Union
 from datetime import datetime
 from tqdm import tqdm
 import os
@@ -8,6 +8,8 @@ import os
 from .storeleads_client import StoreLeadsClient
 from .companyenrich_client import CompanyEnrichClient
 from .lead_scorer import LeadScorer
+from .domain_utils import canonicalize_domain, domain_column_index, DOMAIN_COLUMNS
+from .retry import use_retry_budget, reset_retry_budget
 from .scoring_utils import should_use_companyenrich
 
 class CSVProcessor:
@@ -15,77 +17,106 @@ class CSVProcessor:
         self.storeleads_client = StoreLeadsClient()
         self.companyenrich_client = CompanyEnrichClient()
         self.scorer = LeadScorer()
+        self.queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', 100))
+        # Rows parsed per chunk when streaming input CSVs
+        self.csv_chunk_size = int(os.getenv('CSV_CHUNK_SIZE', 10000))
+        # Optional cap on domains read from one file (0 = no limit)
+        self.max_domains = int(os.getenv('MAX_DOMAINS', 0))
 
     def read_input_csv(self, file_path: str) -> List[str]:
+        return list(self.iter_input_csv(file_path))
+
+    def iter_input_csv(self, file_path: str, chunk_size: int = None) -> Iterator[str]:
+        """
+        Yield domains from a CSV file without loading it into memory.
+
+        The file is parsed `chunk_size` rows at a time. The domain column is
+        picked from the first chunk's header (website, domain or url, else
+        the first column). Files pandas cannot parse are read line by line,
+        taking the first field of each line. Stops after MAX_DOMAINS domains
+        when that is set.
+        """
+        chunk_size = chunk_size or self.csv_chunk_size
+        rows_read = 0
+        count = 0
+
         try:
-            # Try reading with different error handling strategies
             try:
-                # First attempt: standard CSV reading
-                df = pd.read_csv(file_path)
-            except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
-                # If that fails, try reading line by line as simple text
-                try:
-                    with open(file_path, 'r') as f:
-                        lines = f.readlines()
-
-                    # Skip header if it looks like a header
-                    if lines and any(h in lines[0].lower() for h in ['domain', 'website', 'url']):
-                        lines = lines[1:]
-
-                    # Clean each line
-                    domains = []
-                    for line in lines:
-                        line = line.strip()
-                        if line:
-                            # Remove quotes and take first part if there are delimiters
-                            line = line.replace('"', '').replace("'", '')
-                            if ',' in line:
-                                line = line.split(',')[0]
-                            elif '\t' in line:
-                                line = line.split('\t')[0]
-                            line = line.strip()
-                            if line:
-                                domains.append(line)
-
-                    # Create DataFrame from cleaned domains
-                    df = pd.DataFrame({'domain': domains})
-                    print(f"Read {len(domains)} domains from file")
-
-                except Exception as read_error:
-                    print(f"Error reading file line by line: {str(read_error)}")
-                    # Last resort: try pandas with minimal parsing
-                    df = pd.read_csv(file_path, header=None, names=['domain'], sep='\n', engine='python')
-                    print("Warning: Reading file as single column")
-
-            if 'website' in df.columns:
-                websites = df['website'].tolist()
-            elif 'domain' in df.columns:
-                websites = df['domain'].tolist()
-            elif 'url' in df.columns:
-                websites = df['url'].tolist()
-            else:
-                websites = df.iloc[:, 0].tolist()
-
-            websites = [str(w).strip() for w in websites if pd.notna(w) and str(w).strip()]
-
-            # Cap at 4000 domains
-            if len(websites) > 4000:
-                print(f"Warning: Input contains {len(websites)} domains. Limiting to first 4000.")
-                websites = websites[:4000]
-
-            return websites
+                with pd.read_csv(file_path, chunksize=chunk_size, dtype=str) as reader:
+                    column = None
+                    for chunk in reader:
+                        if column is None:
+                            column = self._domain_column(chunk)
+
+                        websites = chunk[column].dropna().str.strip()
+                        for website in websites[websites != ''].tolist():
+                            if self.max_domains and count >= self.max_domains:
+                                print(f"Warning: Limiting input to first {self.max_domains} domains (MAX_DOMAINS).")
+                                return
+                            count += 1
+                            yield website
+
+                        rows_read += len(chunk)
+            except (pd.errors.ParserError, pd.errors.EmptyDataError):
+                # If that fails, read the rest line by line as simple text
+                for website in self._iter_text_domains(file_path, skip=rows_read):
+                    if self.max_domains and count >= self.max_domains:
+                        print(f"Warning: Limiting input to first {self.max_domains} domains (MAX_DOMAINS).")
+                        return
+                    count += 1
+                    yield website
+                print(f"Read {count} domains from file")
         except Exception as e:
             raise ValueError(f"Error reading CSV file: {str(e)}")
 
-    async def process_websites(self, websites: List[str], session_id: str = None, progress_callback=None) -> pd.DataFrame:
-        print(f"\nProcessing {len(websites)} websites...")
-
-        # Progress tracking variables
-        storeleads_total = len(websites)
+    def _domain_column(self, chunk: pd.DataFrame) -> str:
+        return chunk.columns[domain_column_index(chunk.columns)]
+
+    def _iter_text_domains(self, file_path: str, skip: int = 0) -> Iterator[str]:
+        """Yield the first field of each non-empty line, after `skip` rows already parsed by pandas"""
+        with open(file_path, 'r') as f:
+            # Pandas always takes the first line as the header; otherwise skip it if it looks like one
+            header_pending = True
+            for line in f:
+                if header_pending:
+                    header_pending = False
+                    if skip or any(h in line.lower() for h in DOMAIN_COLUMNS):
+                        continue
+
+                line = line.strip()
+                if not line:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+
+                # Remove quotes and take first part if there are delimiters
+                line = line.replace('"', '').replace("'", '')
+                if ',' in line:
+                    line = line.split(',')[0]
+                elif '\t' in line:
+                    line = line.split('\t')[0]
+                line = line.strip()
+                if line:
+                    yield line
+
+    async def process_websites(self, websites: Union[Iterable[str], AsyncIterable[str]], session_id: str = None, progress_callback=None) -> pd.DataFrame:
+        # Lists have a known size; lazy iterables (e.g. iter_input_csv) are counted as they are fed
+        sized = hasattr(websites, '__len__')
+        if sized:
+            print(f"\nProcessing {len(websites)} websites...")
+        else:
+            print("\nProcessing websites as they are read...")
+
+        # Rows are keyed by canonical domain so URL variants and repeats are fetched once
+        canonical = canonicalize_domain
+
+        # Progress tracking variables; provider stages count unique domains, scoring counts rows
+        storeleads_total = len({canonical(website) for website in websites}) if sized else 0
         storeleads_current = 0
         companyenrich_total = 0
         companyenrich_current = 0
-        scoring_total = len(websites)
+        scoring_total = len(websites) if sized else 0
         scoring_current = 0
 
         def update_progress(stage: str = None, message: str = None, error: str = None):
@@ -97,156 +128,150 @@ class CSVProcessor:
                 }
                 progress_callback(progress_data, stage, message, error)
 
-        # First try Store Leads API for all domains
-        pbar = tqdm(total=len(websites), desc="Fetching data from Store Leads API")
-
-        update_progress('storeleads', "Starting Store Leads API fetch...", None)
-
-        def storeleads_progress():
-            nonlocal storeleads_current
-            storeleads_current += 1
-            pbar.update(1)
-            update_progress('storeleads', f"Fetched {storeleads_current}/{storeleads_total} from Store Leads")
-
-        storeleads_results = await self.storeleads_client.fetch_multiple_domains(websites, progress_callback=storeleads_progress)
-        pbar.close()
-
-        # Collect domains that need CompanyEnrich fallback
-        failed_domains = []
-        final_results = []
+        # Each domain flows Store Leads -> (optional) Company Enrich -> scoring on its own,
+        # with bounded queues between the stages so both provider budgets stay busy at once
+        storeleads_queue = asyncio.Queue(maxsize=self.queue_size)
+        companyenrich_queue = asyncio.Queue(maxsize=self.queue_size)
+        scoring_queue = asyncio.Queue(maxsize=self.queue_size)
+        scored_results = []
 
-        for result in storeleads_results:
-            # Use the same logic as API to determine if we need CompanyEnrich
-            if should_use_companyenrich(result):
-                failed_domains.append(result['domain'])
-                final_results.append(result)  # Keep for now, will replace if CompanyEnrich has data
-            else:
-                final_results.append(result)
+        # Row indices waiting on each domain in flight, and the first row of each scored domain
+        pending_rows: Dict[str, List[int]] = {}
+        scored_rows: Dict[str, int] = {}
 
-        # Try Company Enrich API for failed domains
-        if failed_domains:
-            companyenrich_total = len(failed_domains)
-            print(f"\nFetching additional data from Company Enrich API for {len(failed_domains)} domains...")
-            pbar = tqdm(total=len(failed_domains), desc="Fetching from Company Enrich")
+        pbar = tqdm(total=scoring_total if sized else None, desc="Enriching and scoring leads")
 
-            update_progress('companyenrich', f"Starting Company Enrich API for {len(failed_domains)} domains...", None)
+        update_progress('storeleads', "Starting Store Leads API fetch...", None)
 
-            for i, domain in enumerate(failed_domains):
-                companyenrich_current = i + 1
+        async def storeleads_worker(session):
+            nonlocal storeleads_current, companyenrich_total
+            while True:
+                item = await storeleads_queue.get()
+                if item is None:
+                    return
+                domain, website = item
+                result = await self.storeleads_client.fetch_domain_data_async(session, website)
+                storeleads_current += 1
+
+                # Use the same logic as API to determine if we need CompanyEnrich
+                needs_fallback = should_use_companyenrich(result)
+                if needs_fallback:
+                    companyenrich_total += 1
+                update_progress('storeleads', f"Fetched {storeleads_current}/{storeleads_total} from Store Leads")
+
+                if needs_fallback:
+                    await companyenrich_queue.put((domain, result))
+                else:
+                    await scoring_queue.put((domain, result))
+
+        async def companyenrich_worker(session):
+            nonlocal companyenrich_current
+            while True:
+                item = await companyenrich_queue.get()
+                if item is None:
+                    return
+                domain, result = item
+                enrich_result = await self.companyenrich_client.fetch_company_data_async(session, result['domain'])
+                companyenrich_current += 1
+                update_progress('companyenrich', f"Fetched {companyenrich_current}/{companyenrich_total} from Company Enrich")
+
+                # Replace the failed result with Company Enrich data
+                await scoring_queue.put((domain, enrich_result if enrich_result['success'] else result))
+
+        async def scoring_worker():
+            nonlocal scoring_current
+            while True:
+                item = await scoring_queue.get()
+                if item is None:
+                    return
+                domain, result = item
+                rows = pending_rows.pop(domain)
+                scoring_current += len(rows)
                 try:
-                    enrich_result = self.companyenrich_client.fetch_company_data(domain)
-                    if enrich_result['success']:
-                        # Replace the failed result with Company Enrich data
-                        for j, result in enumerate(final_results):
-                            if result['domain'] == domain:
-                                final_results[j] = enrich_result
-                                break
-                    update_progress('companyenrich', f"Fetched {companyenrich_current}/{companyenrich_total} from Company Enrich")
+                    score_data = self.scorer.calculate_score(result)
+                    update_progress('scoring', f"Scored {scoring_current}/{scoring_total} leads")
                 except Exception as e:
-                    update_progress('companyenrich', None, f"Error fetching {domain}: {str(e)}")
+                    update_progress('scoring', None, f"Error scoring {result.get('domain', 'unknown')}: {str(e)}")
+                    # Create a minimal score data for failed scoring
+                    score_data = {
+                        'domain': result.get('domain', 'unknown'),
+                        'score': 0,
+                        'grade': 'F',
+                        'priority': 'Error',
+                        'metrics': {},
+                        'breakdown': {}
+                    }
+                # Fan the result out to every row of this domain
+                row = self._build_row(score_data)
+                for idx in rows:
+                    scored_results[idx] = row
+                scored_rows[domain] = rows[0]
+                pbar.update(len(rows))
+
+        # Workers created below share this run's retry budget
+        budget_token = use_retry_budget()
+
+        storeleads_session = self.storeleads_client.get_session()
+        companyenrich_session = self.companyenrich_client.get_session()
+
+        storeleads_workers = [asyncio.create_task(storeleads_worker(storeleads_session))
+                              for _ in range(self.storeleads_client.concurrency.maximum)]
+        companyenrich_workers = [asyncio.create_task(companyenrich_worker(companyenrich_session))
+                                 for _ in range(self.companyenrich_client.concurrency.maximum)]
+        scorer = asyncio.create_task(scoring_worker())
+
+        async def feed(item):
+            nonlocal storeleads_total, scoring_total, scoring_current
+            idx, website = item
+            domain = canonical(website)
+            scored_results.append(None)
+            if not sized:
+                scoring_total += 1
+
+            if domain in scored_rows:
+                # Already scored earlier in this run
+                scored_results[idx] = scored_results[scored_rows[domain]]
+                scoring_current += 1
                 pbar.update(1)
-
+            elif domain in pending_rows:
+                # Already on its way through the pipeline
+                pending_rows[domain].append(idx)
+            else:
+                pending_rows[domain] = [idx]
+                if not sized:
+                    storeleads_total += 1
+                await storeleads_queue.put((domain, website))
+
+        async def drive():
+            # Uploads parsed while they arrive come in as async iterables
+            if hasattr(websites, '__aiter__'):
+                idx = 0
+                async for website in websites:
+                    await feed((idx, website))
+                    idx += 1
+            else:
+                for item in enumerate(websites):
+                    await feed(item)
+
+            # Drain each stage before closing the next one
+            for _ in storeleads_workers:
+                await storeleads_queue.put(None)
+            await asyncio.gather(*storeleads_workers)
+            for _ in companyenrich_workers:
+                await companyenrich_queue.put(None)
+            await asyncio.gather(*companyenrich_workers)
+            await scoring_queue.put(None)
+
+        tasks = [*storeleads_workers, *companyenrich_workers, scorer]
+        try:
+            # A failing stage surfaces here instead of leaving the others blocked on a full queue
+            await asyncio.gather(drive(), *tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            reset_retry_budget(budget_token)
             pbar.close()
 
-        api_results = final_results
-
-        print("\nScoring leads...")
-        scored_results = []
-
-        update_progress('scoring', "Starting lead scoring...", None)
-
-        for idx, result in enumerate(tqdm(api_results, desc="Calculating lead scores")):
-            scoring_current = idx + 1
-            try:
-                score_data = self.scorer.calculate_score(result)
-                update_progress('scoring', f"Scored {scoring_current}/{scoring_total} leads")
-            except Exception as e:
-                update_progress('scoring', None, f"Error scoring {result.get('domain', 'unknown')}: {str(e)}")
-                # Create a minimal score data for failed scoring
-                score_data = {
-                    'domain': result.get('domain', 'unknown'),
-                    'score': 0,
-                    'grade': 'F',
-                    'priority': 'Error',
-                    'metrics': {},
-                    'breakdown': {}
-                }
-
-            # Core scoring fields
-            row = {
-                'domain': score_data['domain'],
-                'score': score_data['score'],
-                'grade': score_data['grade'],
-                'priority': score_data['priority'],
-                'data_source': score_data['metrics'].get('data_source', 'StoreLeads') if 'metrics' in score_data else 'Unknown',
-
-                # Company info
-                'company_name': score_data['metrics'].get('name', '') if 'metrics' in score_data else '',
-                'website': score_data['metrics'].get('website', '') if 'metrics' in score_data else '',
-                'type': score_data['metrics'].get('type', '') if 'metrics' in score_data else '',
-
-                # Revenue and size metrics
-                'yearly_revenue': score_data['metrics'].get('yearly_revenue', 0) if 'metrics' in score_data else 0,
-                'revenue_range': score_data['metrics'].get('revenue_range', '') if 'metrics' in score_data else '',
-                'employee_count': score_data['metrics'].get('employee_count', 0) if 'metrics' in score_data else 0,
-                'employee_range': score_data['metrics'].get('employee_range', '') if 'metrics' in score_data else '',
-
-                # Industry and categories
-                'industry': score_data['metrics'].get('industry', '') if 'metrics' in score_data else '',
-                'industries': score_data['metrics'].get('industries', '') if 'metrics' in score_data else '',
-                'categories': score_data['metrics'].get('categories', '') if 'metrics' in score_data else '',
-
-                # Location
-                'country': score_data['metrics'].get('country_name', score_data['metrics'].get('country', '')) if 'metrics' in score_data else '',
-                'country_code': score_data['metrics'].get('country_code', '') if 'metrics' in score_data else '',
-                'state': score_data['metrics'].get('state', '') if 'metrics' in score_data else '',
-                'state_code': score_data['metrics'].get('state_code', '') if 'metrics' in score_data else '',
-                'city': score_data['metrics'].get('city', '') if 'metrics' in score_data else '',
-                'address': score_data['metrics'].get('address', '') if 'metrics' in score_data else '',
-                'postal_code': score_data['metrics'].get('postal_code', '') if 'metrics' in score_data else '',
-                'phone': score_data['metrics'].get('phone', '') if 'metrics' in score_data else '',
-
-                # Financial details
-                'stock_symbol': score_data['metrics'].get('stock_symbol', '') if 'metrics' in score_data else '',
-                'stock_exchange': score_data['metrics'].get('stock_exchange', '') if 'metrics' in score_data else '',
-                'total_funding': score_data['metrics'].get('total_funding', 0) if 'metrics' in score_data else 0,
-                'funding_stage': score_data['metrics'].get('funding_stage', '') if 'metrics' in score_data else '',
-                'funding_rounds': score_data['metrics'].get('funding_rounds', 0) if 'metrics' in score_data else 0,
-                'last_funding_amount': score_data['metrics'].get('last_funding_amount', 0) if 'metrics' in score_data else 0,
-                'last_funding_type': score_data['metrics'].get('last_funding_type', '') if 'metrics' in score_data else '',
-
-                # Company metadata
-                'founded_year': score_data['metrics'].get('founded_year', 0) if 'metrics' in score_data else 0,
-                'page_rank': score_data['metrics'].get('page_rank', 0) if 'metrics' in score_data else 0,
-                'technologies': score_data['metrics'].get('technologies', '') if 'metrics' in score_data else '',
-                'keywords': score_data['metrics'].get('keywords', '') if 'metrics' in score_data else '',
-
-                # Social presence
-                'linkedin_url': score_data['metrics'].get('linkedin_url', '') if 'metrics' in score_data else '',
-                'twitter_url': score_data['metrics'].get('twitter_url', '') if 'metrics' in score_data else '',
-                'facebook_url': score_data['metrics'].get('facebook_url', '') if 'metrics' in score_data else '',
-                'crunchbase_url': score_data['metrics'].get('crunchbase_url', '') if 'metrics' in score_data else '',
-
-                # E-commerce specific (from StoreLeads)
-                'platform': score_data['metrics'].get('platform', '') if 'metrics' in score_data else '',
-                'monthly_visits': score_data['metrics'].get('monthly_visits', 0) if 'metrics' in score_data else 0,
-                'platform_rank': score_data['metrics'].get('platform_rank', 0) if 'metrics' in score_data else 0,
-                'rank_percentile': score_data['metrics'].get('rank_percentile', 0) if 'metrics' in score_data else 0,
-                'product_count': score_data['metrics'].get('product_count', 0) if 'metrics' in score_data else 0,
-                'monthly_app_spend': score_data['metrics'].get('monthly_app_spend', 0) if 'metrics' in score_data else 0,
-
-                # Score breakdown
-                'revenue_contrib': score_data['breakdown'].get('revenue_contribution', 0) if 'breakdown' in score_data else 0,
-                'size_contrib': score_data['breakdown'].get('size_contribution', 0) if 'breakdown' in score_data else 0,
-                'traffic_contrib': score_data['breakdown'].get('traffic_contribution', 0) if 'breakdown' in score_data else 0,
-                'rank_contrib': score_data['breakdown'].get('rank_contribution', 0) if 'breakdown' in score_data else 0
-            }
-
-            if 'reason' in score_data:
-                row['notes'] = score_data['reason']
-
-            scored_results.append(row)
-
         df = pd.DataFrame(scored_results)
         df = df.sort_values('score', ascending=False)
         df = df.reset_index(drop=True)
@@ -254,6 +279,82 @@ class CSVProcessor:
 
         return df
 
+    def _build_row(self, score_data: Dict) -> Dict:
+        # Core scoring fields
+        row = {
+            'domain': score_data['domain'],
+            'score': score_data['score'],
+            'grade': score_data['grade'],
+            'priority': score_data['priority'],
+            'data_source': score_data['metrics'].get('data_source', 'StoreLeads') if 'metrics' in score_data else 'Unknown',
+
+            # Company info
+            'company_name': score_data['metrics'].get('name', '') if 'metrics' in score_data else '',
+            'website': score_data['metrics'].get('website', '') if 'metrics' in score_data else '',
+            'type': score_data['metrics'].get('type', '') if 'metrics' in score_data else '',
+
+            # Revenue and size metrics
+            'yearly_revenue': score_data['metrics'].get('yearly_revenue', 0) if 'metrics' in score_data else 0,
+            'revenue_range': score_data['metrics'].get('revenue_range', '') if 'metrics' in score_data else '',
+            'employee_count': score_data['metrics'].get('employee_count', 0) if 'metrics' in score_data else 0,
+            'employee_range': score_data['metrics'].get('employee_range', '') if 'metrics' in score_data else '',
+
+            # Industry and categories
+            'industry': score_data['metrics'].get('industry', '') if 'metrics' in score_data else '',
+            'industries': score_data['metrics'].get('industries', '') if 'metrics' in score_data else '',
+            'categories': score_data['metrics'].get('categories', '') if 'metrics' in score_data else '',
+
+            # Location
+            'country': score_data['metrics'].get('country_name', score_data['metrics'].get('country', '')) if 'metrics' in score_data else '',
+            'country_code': score_data['metrics'].get('country_code', '') if 'metrics' in score_data else '',
+            'state': score_data['metrics'].get('state', '') if 'metrics' in score_data else '',
+            'state_code': score_data['metrics'].get('state_code', '') if 'metrics' in score_data else '',
+            'city': score_data['metrics'].get('city', '') if 'metrics' in score_data else '',
+            'address': score_data['metrics'].get('address', '') if 'metrics' in score_data else '',
+            'postal_code': score_data['metrics'].get('postal_code', '') if 'metrics' in score_data else '',
+            'phone': score_data['metrics'].get('phone', '') if 'metrics' in score_data else '',
+
+            # Financial details
+            'stock_symbol': score_data['metrics'].get('stock_symbol', '') if 'metrics' in score_data else '',
+            'stock_exchange': score_data['metrics'].get('stock_exchange', '') if 'metrics' in score_data else '',
+            'total_funding': score_data['metrics'].get('total_funding', 0) if 'metrics' in score_data else 0,
+            'funding_stage': score_data['metrics'].get('funding_stage', '') if 'metrics' in score_data else '',
+            'funding_rounds': score_data['metrics'].get('funding_rounds', 0) if 'metrics' in score_data else 0,
+            'last_funding_amount': score_data['metrics'].get('last_funding_amount', 0) if 'metrics' in score_data else 0,
+            'last_funding_type': score_data['metrics'].get('last_funding_type', '') if 'metrics' in score_data else '',
+
+            # Company metadata
+            'founded_year': score_data['metrics'].get('founded_year', 0) if 'metrics' in score_data else 0,
+            'page_rank': score_data['metrics'].get('page_rank', 0) if 'metrics' in score_data else 0,
+            'technologies': score_data['metrics'].get('technologies', '') if 'metrics' in score_data else '',
+            'keywords': score_data['metrics'].get('keywords', '') if 'metrics' in score_data else '',
+
+            # Social presence
+            'linkedin_url': score_data['metrics'].get('linkedin_url', '') if 'metrics' in score_data else '',
+            'twitter_url': score_data['metrics'].get('twitter_url', '') if 'metrics' in score_data else '',
+            'facebook_url': score_data['metrics'].get('facebook_url', '') if 'metrics' in score_data else '',
+            'crunchbase_url': score_data['metrics'].get('crunchbase_url', '') if 'metrics' in score_data else '',
+
+            # E-commerce specific (from StoreLeads)
+            'platform': score_data['metrics'].get('platform', '') if 'metrics' in score_data else '',
+            'monthly_visits': score_data['metrics'].get('monthly_visits', 0) if 'metrics' in score_data else 0,
+            'platform_rank': score_data['metrics'].get('platform_rank', 0) if 'metrics' in score_data else 0,
+            'rank_percentile': score_data['metrics'].get('rank_percentile', 0) if 'metrics' in score_data else 0,
+            'product_count': score_data['metrics'].get('product_count', 0) if 'metrics' in score_data else 0,
+            'monthly_app_spend': score_data['metrics'].get('monthly_app_spend', 0) if 'metrics' in score_data else 0,
+
+            # Score breakdown
+            'revenue_contrib': score_data['breakdown'].get('revenue_contribution', 0) if 'breakdown' in score_data else 0,
+            'size_contrib': score_data['breakdown'].get('size_contribution', 0) if 'breakdown' in score_data else 0,
+            'traffic_contrib': score_data['breakdown'].get('traffic_contribution', 0) if 'breakdown' in score_data else 0,
+            'rank_contrib': score_data['breakdown'].get('rank_contribution', 0) if 'breakdown' in score_data else 0
+        }
+
+        if 'reason' in score_data:
+            row['notes'] = score_data['reason']
+
+        return row
+
     def save_results(self, df: pd.DataFrame, output_path: str = None) -> str:
         if output_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
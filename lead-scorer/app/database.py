@@ -3,132 +3,271 @@ Database models and operations for lead scoring API
 """
 import sqlite3
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator, Tuple
 from pathlib import Path
 
+# Domains per IN (...) lookup; older SQLite builds cap host parameters at 999
+LOOKUP_CHUNK_SIZE = 500
+
+# Rows fetched per query when streaming batch job results
+RESULTS_PAGE_SIZE = 500
+
+# Scored domains kept in memory in front of SQLite, and for how many seconds
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", 10000))
+SCORE_CACHE_TTL = float(os.getenv("SCORE_CACHE_TTL", 300))
+
+class ScoreCache:
+    """
+    In-process LRU cache of scored domains with a time-to-live.
+
+    Entries expire after `ttl` seconds so rows written by other workers are
+    picked up; the least recently used entries are dropped beyond `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = SCORE_CACHE_SIZE, ttl: float = SCORE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, domain: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self.entries.get(domain)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[domain]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(domain)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, domain: str, value: Dict):
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self.entries[domain] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(domain)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
 class Database:
     def __init__(self, db_path: str = "lead_scores.db"):
         self.db_path = db_path
+        # One connection per thread, reused across calls
+        self._local = threading.local()
+        # Hot domains are answered from memory without touching SQLite
+        self.cache = ScoreCache()
         self.init_db()
 
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening and tuning it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+
+            # WAL lets readers run alongside the writer; NORMAL sync skips the
+            # fsync on every commit while staying durable across app crashes
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute("PRAGMA cache_size = -16000")
+            conn.execute("PRAGMA busy_timeout = 30000")
+
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     def init_db(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Table for scored domains
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS scored_domains (
-                domain TEXT PRIMARY KEY,
-                score INTEGER NOT NULL,
-                grade TEXT NOT NULL,
-                priority TEXT NOT NULL,
-                attributes TEXT,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Table for batch jobs
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS batch_jobs (
-                job_id TEXT PRIMARY KEY,
-                status TEXT NOT NULL,
-                total_domains INTEGER NOT NULL,
-                processed_domains INTEGER DEFAULT 0,
-                successful_domains INTEGER DEFAULT 0,
-                failed_domains INTEGER DEFAULT 0,
-                webhook_url TEXT,
-                results TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP
-            )
-        """)
-
-        # Index for faster lookups
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_domain_updated
-            ON scored_domains(last_updated DESC)
-        """)
-
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_job_status
-            ON batch_jobs(status, created_at DESC)
-        """)
-
-        conn.commit()
-        conn.close()
+        conn = self._connection()
+
+        with conn:
+            # Table for scored domains
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scored_domains (
+                    domain TEXT PRIMARY KEY,
+                    score INTEGER NOT NULL,
+                    grade TEXT NOT NULL,
+                    priority TEXT NOT NULL,
+                    attributes TEXT,
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Table for batch jobs
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    total_domains INTEGER NOT NULL,
+                    processed_domains INTEGER DEFAULT 0,
+                    successful_domains INTEGER DEFAULT 0,
+                    failed_domains INTEGER DEFAULT 0,
+                    webhook_url TEXT,
+                    results TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP
+                )
+            """)
+
+            # Per-domain results of batch jobs, one row each, in job order
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_job_results (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    domain TEXT NOT NULL,
+                    score INTEGER,
+                    grade TEXT,
+                    priority TEXT,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (job_id, position)
+                )
+            """)
+
+            # Jobs created before results moved to their own table only have
+            # the legacy `results` blob; the summary now has its own column
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(batch_jobs)")]
+            if "summary" not in columns:
+                conn.execute("ALTER TABLE batch_jobs ADD COLUMN summary TEXT")
+
+            # Index for faster lookups
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_domain_updated
+                ON scored_domains(last_updated DESC)
+            """)
+
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_job_status
+                ON batch_jobs(status, created_at DESC)
+            """)
 
     def get_scored_domain(self, domain: str) -> Optional[Dict]:
         """Get a previously scored domain from cache"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        domain = domain.lower()
+        cached = self.cache.get(domain)
+        if cached:
+            return cached
 
-        cursor.execute("""
+        cursor = self._connection().execute("""
             SELECT domain, score, grade, priority, attributes, last_updated
             FROM scored_domains
             WHERE domain = ?
-        """, (domain.lower(),))
+        """, (domain,))
 
         row = cursor.fetchone()
-        conn.close()
 
         if row:
-            return {
-                "domain": row["domain"],
-                "score": row["score"],
-                "grade": row["grade"],
-                "priority": row["priority"],
-                "attributes": json.loads(row["attributes"]) if row["attributes"] else {},
-                "last_updated": row["last_updated"]
-            }
+            result = self._row_to_dict(row)
+            self.cache.put(domain, result)
+            return dict(result)
         return None
 
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict:
+        return {
+            "domain": row["domain"],
+            "score": row["score"],
+            "grade": row["grade"],
+            "priority": row["priority"],
+            "attributes": json.loads(row["attributes"]) if row["attributes"] else {},
+            "last_updated": row["last_updated"]
+        }
+
     def save_scored_domain(self, domain: str, score: int, grade: str,
                            priority: str, attributes: Dict = None):
         """Save a scored domain to cache"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT OR REPLACE INTO scored_domains
-            (domain, score, grade, priority, attributes, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            domain.lower(),
-            score,
-            grade,
-            priority,
-            json.dumps(attributes) if attributes else None,
-            datetime.now()
-        ))
-
-        conn.commit()
-        conn.close()
+        self.save_scored_domains_bulk([{
+            "domain": domain,
+            "score": score,
+            "grade": grade,
+            "priority": priority,
+            "attributes": attributes
+        }])
+
+    def save_scored_domains_bulk(self, rows: List[Dict]):
+        """Save many scored domains to cache in a single transaction"""
+        if not rows:
+            return
+
+        now = datetime.now()
+        conn = self._connection()
+
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO scored_domains
+                (domain, score, grade, priority, attributes, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    row["domain"].lower(),
+                    row["score"],
+                    row["grade"],
+                    row["priority"],
+                    json.dumps(row["attributes"]) if row.get("attributes") else None,
+                    now
+                )
+                for row in rows
+            ])
+
+        # Write-through, in the same shape the database returns
+        for row in rows:
+            self.cache.put(row["domain"].lower(), {
+                "domain": row["domain"].lower(),
+                "score": row["score"],
+                "grade": row["grade"],
+                "priority": row["priority"],
+                "attributes": row.get("attributes") or {},
+                "last_updated": str(now)
+            })
 
     def create_batch_job(self, job_id: str, total_domains: int,
                         webhook_url: Optional[str] = None) -> None:
         """Create a new batch job"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO batch_jobs
-            (job_id, status, total_domains, webhook_url, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (job_id, "processing", total_domains, webhook_url, datetime.now()))
+        conn = self._connection()
 
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute("""
+                INSERT INTO batch_jobs
+                (job_id, status, total_domains, webhook_url, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (job_id, "processing", total_domains, webhook_url, datetime.now()))
 
     def update_batch_job(self, job_id: str, processed: int = None,
                         successful: int = None, failed: int = None,
-                        status: str = None, results: Dict = None):
+                        status: str = None, summary: Dict = None):
         """Update batch job progress"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         updates = []
         params = []
 
@@ -148,9 +287,9 @@ class Database:
             updates.append("status = ?")
             params.append(status)
 
-        if results:
-            updates.append("results = ?")
-            params.append(json.dumps(results))
+        if summary:
+            updates.append("summary = ?")
+            params.append(json.dumps(summary))
 
         if status == "completed" or status == "failed":
             updates.append("completed_at = ?")
@@ -158,28 +297,27 @@ class Database:
 
         params.append(job_id)
 
-        cursor.execute(f"""
-            UPDATE batch_jobs
-            SET {', '.join(updates)}
-            WHERE job_id = ?
-        """, params)
+        conn = self._connection()
 
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute(f"""
+                UPDATE batch_jobs
+                SET {', '.join(updates)}
+                WHERE job_id = ?
+            """, params)
 
     def get_batch_job(self, job_id: str) -> Optional[Dict]:
-        """Get batch job status"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT * FROM batch_jobs
+        """Get batch job status and summary, without the per-domain results"""
+        cursor = self._connection().execute("""
+            SELECT job_id, status, total_domains, processed_domains,
+                   successful_domains, failed_domains, webhook_url,
+                   created_at, completed_at,
+                   COALESCE(summary, json_extract(results, '$.summary')) AS summary
+            FROM batch_jobs
             WHERE job_id = ?
         """, (job_id,))
 
         row = cursor.fetchone()
-        conn.close()
 
         if row:
             return {
@@ -190,38 +328,154 @@ class Database:
                 "successful_domains": row["successful_domains"],
                 "failed_domains": row["failed_domains"],
                 "webhook_url": row["webhook_url"],
-                "results": json.loads(row["results"]) if row["results"] else None,
+                "summary": json.loads(row["summary"]) if row["summary"] else None,
                 "created_at": row["created_at"],
                 "completed_at": row["completed_at"]
             }
         return None
 
+    def save_batch_results(self, job_id: str, results: List[Dict], start: int = 0):
+        """Store per-domain results of a batch job, numbered from `start`"""
+        if not results:
+            return
+
+        conn = self._connection()
+
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO batch_job_results
+                (job_id, position, domain, score, grade, priority, result)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    job_id,
+                    position,
+                    result.get("domain", ""),
+                    result.get("score"),
+                    result.get("grade"),
+                    result.get("priority"),
+                    json.dumps(result)
+                )
+                for position, result in enumerate(results, start)
+            ])
+
+    def iter_batch_results(self, job_id: str, after: int = -1,
+                           limit: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Stream per-domain results of a batch job in order.
+
+        Yields (position, result) for rows after position `after`, at most
+        `limit` of them. Rows are fetched in pages so memory stays flat
+        however large the job is.
+        """
+        conn = self._connection()
+        remaining = limit
+        found = False
+
+        while remaining is None or remaining > 0:
+            page_size = RESULTS_PAGE_SIZE if remaining is None else min(remaining, RESULTS_PAGE_SIZE)
+            rows = conn.execute("""
+                SELECT position, result
+                FROM batch_job_results
+                WHERE job_id = ? AND position > ?
+                ORDER BY position
+                LIMIT ?
+            """, (job_id, after, page_size)).fetchall()
+
+            if not rows:
+                break
+
+            found = True
+            for row in rows:
+                yield row["position"], json.loads(row["result"])
+            after = rows[-1]["position"]
+            if remaining is not None:
+                remaining -= len(rows)
+
+        # Jobs stored before the results table existed keep everything in one blob
+        if not found:
+            row = conn.execute("""
+                SELECT results FROM batch_jobs
+                WHERE job_id = ? AND results IS NOT NULL
+            """, (job_id,)).fetchone()
+            if row:
+                domains = json.loads(row["results"]).get("domains", [])
+                start = after + 1
+                end = None if limit is None else start + limit
+                for position, result in enumerate(domains[start:end], start):
+                    yield position, result
+
     def get_batch_domains(self, domains: List[str]) -> Dict[str, Dict]:
         """Get multiple domains from cache"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # Convert to lowercase for lookup
-        domains_lower = [d.lower() for d in domains]
-        placeholders = ','.join('?' * len(domains_lower))
-
-        cursor.execute(f"""
-            SELECT domain, score, grade, priority, attributes, last_updated
-            FROM scored_domains
-            WHERE domain IN ({placeholders})
-        """, domains_lower)
-
         results = {}
-        for row in cursor.fetchall():
-            results[row["domain"]] = {
-                "domain": row["domain"],
-                "score": row["score"],
-                "grade": row["grade"],
-                "priority": row["priority"],
-                "attributes": json.loads(row["attributes"]) if row["attributes"] else {},
-                "last_updated": row["last_updated"]
-            }
-
-        conn.close()
-        return results
\ No newline at end of file
+        for _, hits in self.iter_batch_domains(domains):
+            results.update(hits)
+        return results
+
+    def iter_batch_domains(self, domains: List[str],
+                           chunk_size: int = LOOKUP_CHUNK_SIZE) -> Iterator[Tuple[List[str], Dict[str, Dict]]]:
+        """
+        Look up cached domains chunk by chunk.
+
+        Yields (chunk, hits) for consecutive slices of `domains`, where hits maps
+        the lowercased domain to its cached row. Each query stays under SQLite's
+        host-parameter limit, and callers can act on early chunks before the
+        rest of the lookup runs.
+        """
+        conn = self._connection()
+
+        for start in range(0, len(domains), chunk_size):
+            chunk = domains[start:start + chunk_size]
+
+            # Convert to lowercase for lookup; domains held in memory skip the query
+            hits = {}
+            missing = []
+            for domain in {d.lower() for d in chunk}:
+                cached = self.cache.get(domain)
+                if cached:
+                    hits[domain] = cached
+                else:
+                    missing.append(domain)
+
+            if missing:
+                placeholders = ','.join('?' * len(missing))
+
+                cursor = conn.execute(f"""
+                    SELECT domain, score, grade, priority, attributes, last_updated
+                    FROM scored_domains
+                    WHERE domain IN ({placeholders})
+                """, missing)
+
+                for row in cursor.fetchall():
+                    result = self._row_to_dict(row)
+                    self.cache.put(row["domain"], result)
+                    hits[row["domain"]] = dict(result)
+
+            yield chunk, hits
+
+    def get_stale_domains(self, before: datetime, after: Optional[Tuple[str, str]] = None,
+                          limit: int = 100) -> List[Tuple[str, str]]:
+        """
+        Oldest scored domains last updated before `before`.
+
+        Returns (last_updated, domain) pairs in that order. Pass the last pair
+        of one page as `after` to continue from it; rows saved in one bulk
+        write share a timestamp, so the domain breaks ties.
+        """
+        if after is None:
+            rows = self._connection().execute("""
+                SELECT last_updated, domain FROM scored_domains
+                WHERE last_updated < ?
+                ORDER BY last_updated, domain
+                LIMIT ?
+            """, (before, limit)).fetchall()
+        else:
+            rows = self._connection().execute("""
+                SELECT last_updated, domain FROM scored_domains
+                WHERE last_updated < ?
+                AND (last_updated > ? OR (last_updated = ? AND domain > ?))
+                ORDER BY last_updated, domain
+                LIMIT ?
+            """, (before, after[0], after[0], after[1], limit)).fetchall()
+
+        return [(row["last_updated"], row["domain"]) for row in rows]
@@ -0,0 +1,54 @@
+"""
+Long-lived, pooled aiohttp sessions for the enrichment API clients
+"""
+import asyncio
+import os
+from typing import Optional
+
+import aiohttp
+
+
+class PooledSession:
+    """
+    Keep-alive aiohttp session owned by one API client.
+
+    The session is opened lazily inside the running event loop and reused
+    for every request, so lookups skip the TCP and TLS handshake once the
+    pool is warm. Pool size, per-host limit, DNS cache TTL and keep-alive
+    timeout can be tuned through environment variables.
+    """
+
+    def __init__(self, limit_per_host: int):
+        self.limit = int(os.getenv('HTTP_POOL_LIMIT', 100))
+        self.limit_per_host = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', limit_per_host))
+        self.dns_cache_ttl = int(os.getenv('HTTP_DNS_CACHE_TTL', 300))
+        self.keepalive_timeout = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 60))
+        self.request_timeout = float(os.getenv('HTTP_TIMEOUT', 30))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> aiohttp.ClientSession:
+        """Return the open session, creating it for the current event loop if needed"""
+        loop = asyncio.get_running_loop()
+
+        # A session is bound to the loop that created it
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._loop = loop
+
+        return self._session
+
+    async def close(self):
+        """Close the session and release pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
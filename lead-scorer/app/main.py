@@ -1,19 +1,20 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import asyncio
 import os
 import json
 from datetime import datetime
-import shutil
 import uuid
 import traceback
 
 from .csv_processor import CSVProcessor
 from .progress_tracker import progress_tracker
+from .sweeper import run_sweeper
+from .upload_stream import MultipartCSVUpload, DomainFeed
 from .api_routes import router as api_router
 
 app = FastAPI(title="Lead Scorer", version="1.0.1")
@@ -42,8 +43,31 @@ class ProcessingStatus(BaseModel):
     result_file: Optional[str] = None
     summary: Optional[Dict] = None
 
-processing_status = {}
-active_websockets: Dict[str, WebSocket] = {}
+sweeper_task: Optional[asyncio.Task] = None
+
+# Running /process jobs, referenced so they are not garbage collected
+processing_tasks: Set[asyncio.Task] = set()
+
+@app.on_event("startup")
+async def open_client_sessions():
+    processor.storeleads_client.get_session()
+    processor.companyenrich_client.get_session()
+
+@app.on_event("startup")
+async def start_sweeper():
+    # Evicts finished sessions and deletes old result files on long-running instances
+    global sweeper_task
+    sweeper_task = asyncio.create_task(run_sweeper())
+
+@app.on_event("shutdown")
+async def close_client_sessions():
+    await processor.storeleads_client.close()
+    await processor.companyenrich_client.close()
+
+@app.on_event("shutdown")
+async def stop_sweeper():
+    if sweeper_task is not None:
+        sweeper_task.cancel()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -434,6 +458,7 @@ async def root():
             let selectedFile = null;
             let resultFile = null;
             let websocket = null;
+            let progressState = {};
             let sessionId = null;
             let activeTab = 'paste';
 
@@ -459,12 +484,7 @@ async def root():
 
                 document.getElementById('domain-count').textContent = count + ' domain' + (count !== 1 ? 's' : '');
 
-                if (count > 4000) {
-                    document.getElementById('domain-count').textContent += ' (Only first 4000 will be processed)';
-                    document.getElementById('domain-count').style.color = '#fc8181';
-                } else {
-                    document.getElementById('domain-count').style.color = '#667eea';
-                }
+                document.getElementById('domain-count').style.color = '#667eea';
 
                 updateProcessButton();
             }
@@ -665,9 +685,11 @@ async def root():
                             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
                             const wsUrl = protocol + '//' + window.location.host + '/ws/' + sessionId;
                             websocket = new WebSocket(wsUrl);
+                            progressState = {};
 
                             websocket.onmessage = (event) => {
-                                const progressData = JSON.parse(event.data);
+                                // Frames after the first only carry changed fields
+                                const progressData = Object.assign(progressState, JSON.parse(event.data));
                                 updateProgress(progressData);
 
                                 // Handle completion with results
@@ -762,9 +784,11 @@ async def root():
                             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
                             const wsUrl = protocol + '//' + window.location.host + '/ws/' + errorData.session_id;
                             websocket = new WebSocket(wsUrl);
+                            progressState = {};
 
                             websocket.onmessage = (event) => {
-                                const progressData = JSON.parse(event.data);
+                                // Frames after the first only carry changed fields
+                                const progressData = Object.assign(progressState, JSON.parse(event.data));
                                 updateProgress(progressData);
                             };
                         }
@@ -801,50 +825,47 @@ async def root():
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
-    active_websockets[session_id] = websocket
 
     try:
-        while True:
-            # Keep connection alive and send progress updates
-            await asyncio.sleep(0.5)
-            progress = progress_tracker.get_progress(session_id)
-            if progress:
-                await websocket.send_json(progress)
-                if progress.get('completed'):
-                    break
+        # Pushed as the session changes: a full snapshot, then coalesced deltas
+        async for frame in progress_tracker.stream_updates(session_id):
+            await websocket.send_json(frame)
+        await websocket.close()
     except WebSocketDisconnect:
         pass
-    finally:
-        if session_id in active_websockets:
-            del active_websockets[session_id]
 
 @app.post("/process")
-async def process_csv(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File must be a CSV")
-
+async def process_csv(request: Request):
     session_id = str(uuid.uuid4())
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    temp_input_path = f"data/temp_input_{timestamp}.csv"
 
-    os.makedirs("data", exist_ok=True)
     os.makedirs("output", exist_ok=True)
 
+    # The upload is parsed as it arrives; nothing is written to disk
+    upload = MultipartCSVUpload(request)
+    domains = upload.domains()
+
+    # Closed on every path out, so a rejected upload doesn't leave the stream half read
     try:
-        with open(temp_input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        try:
+            first_website = await domains.__anext__()
+        except StopAsyncIteration:
+            first_website = None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        websites = processor.read_input_csv(temp_input_path)
+        if not upload.filename or not upload.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="File must be a CSV")
 
-        if len(websites) == 0:
+        if first_website is None:
             raise HTTPException(status_code=400, detail="No valid websites found in CSV")
 
-        # Already handled by csv_processor (capped at 500)
+        # Create progress tracking session; the total grows as the upload is read
+        progress_tracker.create_session(session_id, 0)
 
-        # Create progress tracking session
-        progress_tracker.create_session(session_id, len(websites))
+        websites = DomainFeed()
+        await websites.put(first_website)
 
-        # Start processing in background
         async def process_in_background():
             try:
                 # Progress callback with API-specific progress
@@ -868,16 +889,9 @@ async def process_csv(background_tasks: BackgroundTasks, file: UploadFile = File
                         stage=stage,
                         message=message,
                         error=error,
-                        api_progress=progress_data
+                        api_progress=progress_data,
+                        total=progress_data['storeleads']['total'] if progress_data else None
                     )
-                    # Send WebSocket update if connected
-                    if session_id in active_websockets:
-                        try:
-                            asyncio.create_task(active_websockets[session_id].send_json(
-                                progress_tracker.get_progress(session_id)
-                            ))
-                        except:
-                            pass
 
                 # Process with progress tracking
                 df = await processor.process_websites(websites, session_id, update_progress)
@@ -889,53 +903,51 @@ async def process_csv(background_tasks: BackgroundTasks, file: UploadFile = File
                 summary = processor.generate_summary(df)
 
                 # Store results in progress tracker
-                progress_data = progress_tracker.get_progress(session_id)
-                if progress_data:
-                    progress_data['result_file'] = output_filename
-                    progress_data['summary'] = summary
+                progress_tracker.set_result(session_id, result_file=output_filename, summary=summary)
 
-                # Mark session as complete
+                # Mark session as complete (subscribers get the final frame)
                 progress_tracker.complete_session(session_id, success=True)
 
-                # Send final update
-                if session_id in active_websockets:
-                    try:
-                        await active_websockets[session_id].send_json(
-                            progress_tracker.get_progress(session_id)
-                        )
-                    except:
-                        pass
-
             except Exception as e:
                 error_detail = f"{str(e)}\n{traceback.format_exc()}"
                 progress_tracker.update_progress(session_id, error=error_detail)
                 progress_tracker.complete_session(session_id, success=False, message=str(e))
 
-        # Add to background tasks
-        background_tasks.add_task(process_in_background)
-
-        # Return immediately with session ID
-        return {
-            "status": "processing",
-            "session_id": session_id,
-            "message": f"Processing {len(websites)} websites in background"
-        }
-
-    except Exception as e:
-        # Log detailed error
-        error_detail = f"{str(e)}\n{traceback.format_exc()}"
-        progress_tracker.update_progress(session_id, error=error_detail)
-        progress_tracker.complete_session(session_id, success=False, message=str(e))
-
-        raise HTTPException(status_code=500, detail={
-            "error": str(e),
-            "session_id": session_id,
-            "traceback": traceback.format_exc()
-        })
-
+        # Scoring starts while the rest of the upload is still being received
+        task = asyncio.create_task(process_in_background())
+        processing_tasks.add(task)
+        task.add_done_callback(processing_tasks.discard)
+
+        try:
+            # Reading the rest keeps pace with scoring; it waits while the feed is full
+            await websites.fill(domains, task)
+
+            # Return with session ID once the upload is read; processing continues in the background
+            return {
+                "status": "processing",
+                "session_id": session_id,
+                "message": "Processing websites in background"
+            }
+
+        except ValueError as e:
+            task.cancel()
+            progress_tracker.complete_session(session_id, success=False, message=str(e))
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            task.cancel()
+
+            # Log detailed error
+            error_detail = f"{str(e)}\n{traceback.format_exc()}"
+            progress_tracker.update_progress(session_id, error=error_detail)
+            progress_tracker.complete_session(session_id, success=False, message=str(e))
+
+            raise HTTPException(status_code=500, detail={
+                "error": str(e),
+                "session_id": session_id,
+                "traceback": traceback.format_exc()
+            })
     finally:
-        if os.path.exists(temp_input_path):
-            os.remove(temp_input_path)
+        await domains.aclose()
 
 @app.get("/download/{filename}")
 async def download_file(filename: str):
@@ -0,0 +1,263 @@
+"""
+State backends for ProgressTracker
+
+The in-memory store keeps sessions in this process only. The SQLite store
+keeps them in a file shared by every worker on the host, so progress and
+results can be read from whichever worker a request lands on.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+# Which store ProgressTracker uses: "memory" (default) or "sqlite"
+PROGRESS_BACKEND = os.getenv('PROGRESS_BACKEND', 'memory').lower()
+
+# SQLite file shared by all workers when PROGRESS_BACKEND=sqlite
+PROGRESS_DB_PATH = os.getenv('PROGRESS_DB_PATH', 'progress.db')
+
+# Seconds between checks for changes written by other workers
+PROGRESS_POLL_INTERVAL = float(os.getenv('PROGRESS_POLL_INTERVAL', 1.0))
+
+# Minimum seconds between progress writes for one session; updates in between are merged
+PROGRESS_WRITE_INTERVAL = float(os.getenv('PROGRESS_WRITE_INTERVAL', 0.5))
+
+
+class MemoryProgressStore:
+    """Sessions held in a dict, visible to this process only"""
+
+    # Every change happens in this process, so local notifications are enough
+    poll_interval: Optional[float] = None
+    # Writes are cheap enough to apply one by one
+    write_interval: Optional[float] = None
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict] = {}
+        self.versions: Dict[str, int] = {}
+        # Last write time per session, least recently written first
+        self.touched: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _touch(self, session_id: str):
+        self.touched[session_id] = time.time()
+        self.touched.move_to_end(session_id)
+
+    def create(self, session_id: str, data: Dict):
+        """Store a new session, replacing any previous one with the same id"""
+        with self._lock:
+            self.sessions[session_id] = data
+            self.versions[session_id] = self.versions.get(session_id, 0) + 1
+            self._touch(session_id)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        return self.sessions.get(session_id)
+
+    def version(self, session_id: str) -> Optional[int]:
+        """Change counter of a session, or None if it does not exist"""
+        if session_id not in self.sessions:
+            return None
+        return self.versions.get(session_id)
+
+    def update(self, session_id: str, mutate: Callable[[Dict], None]) -> Optional[Dict]:
+        """Apply `mutate` to a session in place, atomically"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            mutate(session)
+            self.versions[session_id] += 1
+            self._touch(session_id)
+            return session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        self.sessions.pop(session_id, None)
+        self.versions.pop(session_id, None)
+        self.touched.pop(session_id, None)
+
+    def evict(self, max_age: float, max_sessions: int) -> List[str]:
+        """
+        Drop sessions not written for `max_age` seconds, then the least
+        recently written ones beyond `max_sessions`. Returns the removed ids.
+        """
+        cutoff = time.time() - max_age
+        removed = []
+
+        with self._lock:
+            while self.touched:
+                session_id, touched_at = next(iter(self.touched.items()))
+                if touched_at >= cutoff and len(self.touched) <= max_sessions:
+                    break
+                self._remove(session_id)
+                removed.append(session_id)
+
+        return removed
+
+
+class SQLiteProgressStore:
+    """
+    Sessions held in a SQLite file shared by all workers on one host.
+
+    Each update is a read-modify-write inside a BEGIN IMMEDIATE transaction,
+    so concurrent writers from different processes never lose each other's
+    changes. Every write bumps the session's version, which readers poll to
+    notice changes made by other workers. Each write takes the database lock,
+    so ProgressTracker merges frequent updates into one per `write_interval`.
+    """
+
+    poll_interval: Optional[float] = PROGRESS_POLL_INTERVAL
+    write_interval: Optional[float] = PROGRESS_WRITE_INTERVAL
+
+    def __init__(self, db_path: str = PROGRESS_DB_PATH):
+        self.db_path = db_path
+        # One connection per thread, reused across calls
+        self._local = threading.local()
+        self.init_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening and tuning it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Transactions are managed explicitly so updates can take the write lock up front
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA busy_timeout = 30000")
+
+            self._local.conn = conn
+        return conn
+
+    def init_db(self):
+        """Initialize the sessions table"""
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS progress_sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        self._connection().execute("""
+            CREATE INDEX IF NOT EXISTS idx_progress_updated
+            ON progress_sessions(updated_at)
+        """)
+
+    def create(self, session_id: str, data: Dict):
+        """Store a new session, replacing any previous one with the same id"""
+        self._connection().execute("""
+            INSERT INTO progress_sessions (session_id, data, version, updated_at)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                data = excluded.data,
+                version = version + 1,
+                updated_at = excluded.updated_at
+        """, (session_id, json.dumps(data), datetime.now()))
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        row = self._connection().execute("""
+            SELECT data FROM progress_sessions WHERE session_id = ?
+        """, (session_id,)).fetchone()
+
+        if row:
+            return json.loads(row["data"])
+        return None
+
+    def version(self, session_id: str) -> Optional[int]:
+        """Change counter of a session, or None if it does not exist"""
+        row = self._connection().execute("""
+            SELECT version FROM progress_sessions WHERE session_id = ?
+        """, (session_id,)).fetchone()
+
+        if row:
+            return row["version"]
+        return None
+
+    def update(self, session_id: str, mutate: Callable[[Dict], None]) -> Optional[Dict]:
+        """Apply `mutate` to a session under the database write lock"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            row = conn.execute("""
+                SELECT data FROM progress_sessions WHERE session_id = ?
+            """, (session_id,)).fetchone()
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            session = json.loads(row["data"])
+            mutate(session)
+
+            conn.execute("""
+                UPDATE progress_sessions
+                SET data = ?, version = version + 1, updated_at = ?
+                WHERE session_id = ?
+            """, (json.dumps(session), datetime.now(), session_id))
+            conn.execute("COMMIT")
+            return session
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id: str):
+        self._connection().execute("""
+            DELETE FROM progress_sessions WHERE session_id = ?
+        """, (session_id,))
+
+    def evict(self, max_age: float, max_sessions: int) -> List[str]:
+        """
+        Drop sessions not written for `max_age` seconds, then the least
+        recently written ones beyond `max_sessions`. Returns the removed ids.
+        """
+        conn = self._connection()
+        cutoff = datetime.now() - timedelta(seconds=max_age)
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            rows = conn.execute("""
+                SELECT session_id FROM progress_sessions
+                WHERE updated_at < ?
+                UNION
+                SELECT session_id FROM (
+                    SELECT session_id FROM progress_sessions
+                    ORDER BY updated_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (cutoff, max_sessions)).fetchall()
+            removed = [row["session_id"] for row in rows]
+
+            conn.executemany("""
+                DELETE FROM progress_sessions WHERE session_id = ?
+            """, [(session_id,) for session_id in removed])
+            conn.execute("COMMIT")
+            return removed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_progress_store():
+    """Build the store selected by PROGRESS_BACKEND"""
+    if PROGRESS_BACKEND == 'sqlite':
+        return SQLiteProgressStore(PROGRESS_DB_PATH)
+    if PROGRESS_BACKEND != 'memory':
+        raise ValueError(f"Unknown PROGRESS_BACKEND: {PROGRESS_BACKEND}")
+    return MemoryProgressStore()
@@ -0,0 +1,91 @@
+"""
+Token-bucket rate limiting shared by the enrichment API clients
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket that refills at `rate` tokens per second up to `capacity`.
+
+    Every request takes one token. When the bucket is empty the token is
+    borrowed from the future and the caller waits until it would have been
+    refilled, so callers are served in arrival order and the long-run rate
+    never exceeds `rate`. The same bucket can be used from threads (sync
+    clients) and from any event loop (async clients).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("Rate limit must be greater than zero")
+
+        self.rate = float(rate)
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _reserve(self) -> float:
+        """Take a token and return how long to wait before it may be used"""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def penalize(self, delay: float):
+        """
+        Hold back every caller for at least `delay` seconds, e.g. after the
+        provider answered 429. Tokens already borrowed keep their place.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -delay * self.rate)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now, without borrowing"""
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def acquire(self):
+        """Block the current thread until a token is available"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a token is available"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: Optional[int] = None) -> TokenBucket:
+    """
+    Return the process-wide bucket for `name`, creating it on first use.
+
+    All clients of the same provider share one bucket, so the configured
+    quota holds no matter how many call sites are active at once.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = TokenBucket(rate, capacity)
+        return _limiters[name]
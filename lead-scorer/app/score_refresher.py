@@ -0,0 +1,145 @@
+"""
+Freshness policy for cached scores and background re-enrichment of stale ones
+"""
+import asyncio
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .rate_limiter import TokenBucket
+
+# Cached scores younger than this many seconds are served as they are
+SCORE_FRESH_TTL = float(os.getenv('SCORE_FRESH_TTL', 7 * 86400))
+
+# Older scores up to this age are served while a refresh is queued; beyond it they are re-scored
+SCORE_MAX_AGE = float(os.getenv('SCORE_MAX_AGE', 30 * 86400))
+
+# Share of the Store Leads rate limit the background refresher may use (0 disables it)
+REFRESH_RATE_SHARE = float(os.getenv('REFRESH_RATE_SHARE', 0.2))
+
+# Most stale domains waiting for a refresh at once
+REFRESH_MAX_PENDING = int(os.getenv('REFRESH_MAX_PENDING', 10000))
+
+# Seconds to wait after a full pass over stale rows before starting the next
+REFRESH_IDLE_INTERVAL = float(os.getenv('REFRESH_IDLE_INTERVAL', 60))
+
+# Stale rows read from the database per sweep query
+REFRESH_SWEEP_BATCH = 100
+
+
+def score_age(result: Dict) -> float:
+    """Seconds since a cached score was written"""
+    try:
+        updated = datetime.fromisoformat(str(result["last_updated"]))
+    except (KeyError, ValueError):
+        return float('inf')
+    return (datetime.now() - updated).total_seconds()
+
+
+def freshness(result: Dict) -> str:
+    """'fresh', 'stale' (serve and refresh) or 'expired' (re-score now)"""
+    age = score_age(result)
+    if age <= SCORE_FRESH_TTL:
+        return 'fresh'
+    if age <= SCORE_MAX_AGE:
+        return 'stale'
+    return 'expired'
+
+
+class ScoreRefresher:
+    """
+    Re-enrich stale cached scores in the background.
+
+    Domains served stale are refreshed first, most requested first. When
+    none are waiting, the refresher walks the oldest rows past the freshness
+    TTL. Refreshes are paced by their own token bucket, so they never take
+    more than the configured share of the provider budget from live traffic.
+    `refresh` re-scores one domain and returns False if it kept the old row.
+    """
+
+    def __init__(self, db, refresh: Callable[[str], Awaitable[bool]], rate: float):
+        self.db = db
+        self.refresh = refresh
+        self.rate = rate
+        self.bucket = TokenBucket(rate, 1) if rate > 0 else None
+
+        # Stale domains waiting for a refresh, with how often they were requested
+        self.pending: Dict[str, int] = {}
+        self.sweep_queue: Deque[str] = deque()
+        self.sweep_cursor: Optional[Tuple[str, str]] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self.refreshed = 0
+        self.kept = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.bucket is not None
+
+    def request(self, domain: str):
+        """Queue a domain that was just served stale"""
+        if not self.enabled:
+            return
+
+        if domain in self.pending:
+            self.pending[domain] += 1
+        elif len(self.pending) < REFRESH_MAX_PENDING:
+            self.pending[domain] = 1
+
+        if self._wake is not None:
+            self._wake.set()
+
+    def _next_domain(self) -> Optional[str]:
+        if self.pending:
+            domain = max(self.pending, key=self.pending.get)
+            del self.pending[domain]
+            return domain
+
+        # Nothing requested: continue through the oldest rows past the freshness TTL
+        if not self.sweep_queue:
+            cutoff = datetime.now() - timedelta(seconds=SCORE_FRESH_TTL)
+            rows = self.db.get_stale_domains(cutoff, self.sweep_cursor, REFRESH_SWEEP_BATCH)
+            if rows:
+                self.sweep_cursor = rows[-1]
+                self.sweep_queue.extend(domain for _, domain in rows)
+            else:
+                # End of the pass; rows that failed to refresh are retried on the next one
+                self.sweep_cursor = None
+
+        return self.sweep_queue.popleft() if self.sweep_queue else None
+
+    async def run(self):
+        """Refresh until cancelled"""
+        self._wake = asyncio.Event()
+
+        while True:
+            domain = self._next_domain()
+            if domain is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=REFRESH_IDLE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+
+            await self.bucket.acquire_async()
+            try:
+                if await self.refresh(domain):
+                    self.refreshed += 1
+                else:
+                    self.kept += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error refreshing {domain}: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "rate": self.rate,
+            "pending": len(self.pending),
+            "refreshed": self.refreshed,
+            "kept": self.kept,
+            "failed": self.failed
+        }
@@ -0,0 +1,47 @@
+"""
+Coalescing of concurrent lookups for the same key
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Run one call per key at a time and share its result with every caller
+    that asks for the same key while it is in flight.
+
+    The shared call runs as its own task, so a caller that goes away (a
+    client disconnect cancelling its request) does not cancel it for the
+    others. Once it finishes the key is free again; results are not kept.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self.calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self.calls[key] = call
+            call.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+        # Nobody may be left to await a failed call; retrieve it so it isn't logged
+        if not call.cancelled():
+            call.exception()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self.calls),
+            "started": self.started,
+            "shared": self.shared
+        }
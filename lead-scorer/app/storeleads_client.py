@@ -1,11 +1,14 @@
 import os
-import requests
-import asyncio
 import aiohttp
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from dotenv import load_dotenv
-import time
-from urllib.parse import urlparse
+
+from .rate_limiter import get_rate_limiter
+from .concurrency import get_concurrency_limiter
+from .negative_cache import get_negative_cache
+from .retry import RETRYABLE_STATUSES, get_json_with_retry, get_json_with_retry_sync, is_transient_error
+from .http_session import PooledSession
+from .domain_utils import canonicalize_domain
 
 load_dotenv()
 
@@ -21,110 +24,84 @@ class StoreLeadsClient:
             "Content-Type": "application/json"
         }
         self.rate_limit = int(os.getenv('API_RATE_LIMIT', 5))
-        self.last_request_time = 0
+        # Shared by every StoreLeadsClient in the process, sync and async alike
+        self.rate_limiter = get_rate_limiter(
+            'storeleads', self.rate_limit, int(os.getenv('API_RATE_BURST', self.rate_limit))
+        )
+        # Requests in flight adapt between 1 and this cap, starting at the rate limit
+        self.concurrency = get_concurrency_limiter(
+            'storeleads', self.rate_limit, int(os.getenv('API_MAX_CONCURRENCY', self.rate_limit * 4))
+        )
+        self.http = PooledSession(limit_per_host=self.concurrency.maximum)
+        # Domains this provider recently returned 404 for, shared process-wide
+        self.not_found = get_negative_cache(
+            'storeleads', float(os.getenv('STORELEADS_NOT_FOUND_TTL', 7 * 86400))
+        )
 
     def _extract_domain(self, url: str) -> str:
-        # Clean up the URL first
-        url = url.strip()
-
-        # Fix common typos like https:/www. (missing second slash)
-        url = url.replace('https:/www.', 'https://www.')
-        url = url.replace('http:/www.', 'http://www.')
-
-        # Add protocol if missing
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-
-        # Parse the URL
-        parsed = urlparse(url)
-        domain = parsed.netloc or parsed.path
-
-        # Remove www. prefix
-        domain = domain.replace('www.', '')
-
-        # Remove any trailing slashes or paths
-        domain = domain.split('/')[0]
-
-        # Remove any port numbers
-        domain = domain.split(':')[0]
-
-        return domain.lower()
-
-    def _rate_limit_wait(self):
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        min_interval = 1.0 / self.rate_limit
-
-        if time_since_last < min_interval:
-            time.sleep(min_interval - time_since_last)
-
-        self.last_request_time = time.time()
+        # Shared with the cache and batch API so every caller uses the same key
+        return canonicalize_domain(url)
+
+    def _not_found(self, domain: str) -> Dict:
+        return {
+            'domain': domain,
+            'success': False,
+            'error': 'Domain not found in Store Leads database'
+        }
 
     async def fetch_domain_data_async(self, session: aiohttp.ClientSession, domain: str) -> Dict:
         domain = self._extract_domain(domain)
+        if self.not_found.contains(domain):
+            return self._not_found(domain)
+
         url = f"{self.base_url}/all/domain/{domain}"
 
         try:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    # Extract the nested 'domain' data if it exists
-                    domain_data = data.get('domain', data)
-                    return {
-                        'domain': domain,
-                        'success': True,
-                        'data': domain_data
-                    }
-                elif response.status == 404:
-                    return {
-                        'domain': domain,
-                        'success': False,
-                        'error': 'Domain not found in Store Leads database'
-                    }
-                else:
-                    return {
-                        'domain': domain,
-                        'success': False,
-                        'error': f'API error: {response.status}'
-                    }
+            status, data = await get_json_with_retry(session, url, self.headers, self.rate_limiter, self.concurrency)
+            if status == 200:
+                # Extract the nested 'domain' data if it exists
+                domain_data = data.get('domain', data)
+                return {
+                    'domain': domain,
+                    'success': True,
+                    'data': domain_data
+                }
+            elif status == 404:
+                self.not_found.add(domain)
+                return self._not_found(domain)
+            else:
+                return {
+                    'domain': domain,
+                    'success': False,
+                    'error': f'API error: {status}',
+                    # Still throttled or failing after retries; not a real absence of data
+                    'transient': status in RETRYABLE_STATUSES
+                }
         except Exception as e:
             return {
                 'domain': domain,
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'transient': is_transient_error(e)
             }
 
-    async def fetch_multiple_domains(self, domains: List[str], progress_callback=None) -> List[Dict]:
-        results = []
-
-        connector = aiohttp.TCPConnector(limit=self.rate_limit)
-        timeout = aiohttp.ClientTimeout(total=30)
+    def get_session(self) -> aiohttp.ClientSession:
+        """Shared keep-alive session for async requests"""
+        return self.http.get()
 
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            semaphore = asyncio.Semaphore(self.rate_limit)
-
-            async def fetch_with_semaphore(domain):
-                async with semaphore:
-                    result = await self.fetch_domain_data_async(session, domain)
-                    if progress_callback:
-                        progress_callback()
-                    await asyncio.sleep(1.0 / self.rate_limit)
-                    return result
-
-            tasks = [fetch_with_semaphore(domain) for domain in domains]
-            results = await asyncio.gather(*tasks)
-
-        return results
+    async def close(self):
+        await self.http.close()
 
     def fetch_domain_data(self, domain: str) -> Dict:
-        self._rate_limit_wait()
         domain = self._extract_domain(domain)
+        if self.not_found.contains(domain):
+            return self._not_found(domain)
+
         url = f"{self.base_url}/all/domain/{domain}"
 
         try:
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                data = response.json()
+            status, data = get_json_with_retry_sync(url, self.headers, self.rate_limiter)
+            if status == 200:
                 # Extract the nested 'domain' data if it exists
                 domain_data = data.get('domain', data)
                 return {
@@ -132,21 +109,21 @@ class StoreLeadsClient:
                     'success': True,
                     'data': domain_data
                 }
-            elif response.status_code == 404:
-                return {
-                    'domain': domain,
-                    'success': False,
-                    'error': 'Domain not found in Store Leads database'
-                }
+            elif status == 404:
+                self.not_found.add(domain)
+                return self._not_found(domain)
             else:
                 return {
                     'domain': domain,
                     'success': False,
-                    'error': f'API error: {response.status_code}'
+                    'error': f'API error: {status}',
+                    # Still throttled or failing after retries; not a real absence of data
+                    'transient': status in RETRYABLE_STATUSES
                 }
         except Exception as e:
             return {
                 'domain': domain,
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'transient': is_transient_error(e)
             }
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Background cleanup of expired progress sessions and old result files
+"""
+import asyncio
+import glob
+import os
+import time
+from typing import Dict
+
+from .progress_tracker import progress_tracker
+
+# Seconds between sweeps
+SWEEP_INTERVAL = float(os.getenv('SWEEP_INTERVAL', 300))
+
+# Result CSVs older than this many seconds are deleted
+OUTPUT_FILE_TTL = float(os.getenv('OUTPUT_FILE_TTL', 86400))
+
+
+def cleanup_output_files(directory: str = "output", max_age: float = OUTPUT_FILE_TTL) -> int:
+    """Delete lead_scores_*.csv files older than `max_age` seconds; returns how many were removed"""
+    cutoff = time.time() - max_age
+    removed = 0
+
+    for path in glob.glob(os.path.join(directory, "lead_scores_*.csv")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            # Already removed by another worker, or still being written
+            pass
+
+    return removed
+
+
+def sweep(directory: str = "output") -> Dict[str, int]:
+    """Run one sweep of sessions and result files"""
+    return {
+        "sessions": progress_tracker.evict_expired(),
+        "files": cleanup_output_files(directory)
+    }
+
+
+async def run_sweeper(interval: float = SWEEP_INTERVAL, directory: str = "output"):
+    """Sweep periodically until cancelled"""
+    while True:
+        try:
+            counts = sweep(directory)
+            if counts["sessions"] or counts["files"]:
+                print(f"Sweeper removed {counts['sessions']} sessions and {counts['files']} result files")
+        except Exception as e:
+            print(f"Sweeper error: {str(e)}")
+
+        await asyncio.sleep(interval)
@@ -0,0 +1,58 @@
+"""
+Check that batch results use the same "domains" key whether they are fetched
+in pages or as one document. Runs offline: provider lookups are stubbed.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('STORELEADS_API_KEY', 'test')
+os.environ.setdefault('COMPANYENRICH_API_KEY', 'test')
+os.environ['LEADSCORER_API_KEY'] = 'test-key'
+
+# The database is created in the working directory; keep it out of the repo
+os.chdir(tempfile.mkdtemp())
+
+from fastapi.testclient import TestClient
+
+from app import api_routes
+from app.main import app
+
+HEADERS = {'x-api-key': 'test-key'}
+
+
+async def fake_enrich_and_score(domain: str, hedge: bool = False):
+    return {
+        'domain': domain,
+        'score': 50,
+        'grade': 'C',
+        'priority': 'Medium',
+        'attributes': {'employee_count': 10}
+    }
+
+
+def test_batch_results_key():
+    api_routes.enrich_and_score = fake_enrich_and_score
+    domains = [f"example{i}.com" for i in range(5)]
+
+    with TestClient(app) as client:
+        job = client.post('/api/score-batch', json={'domains': domains, 'use_cache': False}, headers=HEADERS).json()
+        url = f"/api/batch-results/{job['job_id']}"
+
+        full = client.get(url, headers=HEADERS).json()
+        first = client.get(url, params={'limit': 3}, headers=HEADERS).json()
+        rest = client.get(url, params={'limit': 3, 'cursor': first['next_cursor']}, headers=HEADERS).json()
+
+    # The whole document, in input order
+    assert [result['domain'] for result in full['domains']] == domains
+
+    # The same results, page by page
+    assert [result['domain'] for result in first['domains'] + rest['domains']] == domains
+    assert rest['next_cursor'] is None
+    assert first['summary'] == full['summary']
+
+
+if __name__ == "__main__":
+    test_batch_results_key()
+    print("✓ Batch results use the same key in both shapes")